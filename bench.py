@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""Benchmarks dos caminhos quentes do relógio (renderização, comandos, configuração e inicialização).
+
+Uso:
+    python3 bench.py                    # roda e compara com bench_baseline.json
+    python3 bench.py --save-baseline    # grava os resultados atuais como baseline
+    python3 bench.py --filter frame     # só os benchmarks cujo nome contém "frame"
+
+Cada resultado traz ops/s e, para frames, bytes escritos por frame. A comparação
+falha (código de saída 1) quando ops/s cai ou bytes/frame sobe além da tolerância,
+ou quando a inicialização (--startup-profile) passa do STARTUP_BUDGET_MS de main.py.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import clockstatus
+import main
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+FRAME_SIZE = (50, 160)  # (linhas, colunas) do terminal simulado
+WORLD_ZONES = 300
+STOPWATCH_LAPS = 5000
+STARTUP_RUNS = 5
+# Arquivos ~/.py_clock_* de main.py, apontados para um diretório temporário durante a execução
+HOME_FILES = ("CONFIG_FILE", "TZ_INDEX_FILE", "HISTORY_FILE", "HISTORY_INDEX", "METRICS_FILE")
+
+
+class FakeScreen:
+    """Substituto do stdscr que só registra as chamadas e os bytes escritos."""
+
+    def __init__(self, h, w):
+        self.h, self.w = h, w
+        self.calls = 0
+        self.bytes_written = 0
+
+    def getmaxyx(self):
+        return self.h, self.w
+
+    def addstr(self, y, x, text, attr=0):
+        self.calls += 1
+        self.bytes_written += len(text.encode("utf-8"))
+
+    def clear(self):
+        self.calls += 1
+
+    def refresh(self):
+        self.calls += 1
+
+    def noutrefresh(self):
+        self.calls += 1
+
+
+def measure(fn, min_time=0.2, repeat=3):
+    """Retorna o melhor ops/s entre `repeat` rodadas de pelo menos `min_time` segundos."""
+    best = 0.0
+    for _ in range(repeat):
+        count = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            count += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, count / elapsed)
+    return best
+
+
+class Results(dict):
+    """Resultados por nome; só mede os que contêm `pattern` (o --filter)."""
+
+    def __init__(self, pattern=""):
+        super().__init__()
+        self.pattern = pattern
+
+    def wants(self, *names):
+        return any(self.pattern in name for name in names)
+
+    def measure(self, name, fn):
+        if self.wants(name):
+            self[name] = {"ops": measure(fn)}
+
+
+def produces(*names):
+    """Declara os resultados de um benchmark, para o --filter pular o benchmark inteiro (e o preparo)."""
+    def wrap(fn):
+        fn.names = names
+        return fn
+    return wrap
+
+
+# --- Benchmarks ---
+@produces(*(f"render_time_string[{color}{suffix}]" for color in main.COLORS for suffix in ("", ",cached")),
+          "font[resize]")
+def bench_render(results):
+    for color in main.COLORS:
+        random_mode = color == "random"
+        attr = main.pair_map.get(color, main.pair_map["white"])
+
+        def cold(attr=attr, random_mode=random_mode):
+            main.render_time_string.cache_clear()
+            main._glyph_rows.cache_clear()
+            main.render_time_string("12:34:56", attr, random_mode)
+
+        def hot(attr=attr, random_mode=random_mode):
+            main.render_time_string("12:34:56", attr, random_mode)
+
+        results.measure(f"render_time_string[{color}]", cold)
+        results.measure(f"render_time_string[{color},cached]", hot)
+
+    def rebuild():
+        # O que um resize custa no pior caso: recalcular o tamanho e montar o maior atlas
+        main.pick_font_size.cache_clear()
+        main.font_atlas.cache_clear()
+        main.font_atlas(main.pick_font_size(FRAME_SIZE[0], FRAME_SIZE[1], 8))
+
+    results.measure("font[resize]", rebuild)
+
+
+COMMANDS = [
+    "date", "quote", "blink", "mode stopwatch", "start", "pause", "lap", "laps", "reset",
+    "set timer 5m", "set alarm 07:30", "clear alarm", "set pomodoro work 25m", "set pomodoro break 5m",
+    "alarm add standup 09:15 weekdays", "alarms", "countdown add tea 3m", "countdowns",
+    "add tz Europe/London", "remove tz Europe/London", "add tz sp nyc PST", "find tz sao paolo",
+    "list tz", "sort tz offset", "group tz",
+    "hud", "help", "frobnicate",
+]
+
+def _command_state():
+    state = dict(main.default_state(), mode="stopwatch", stopwatch_start=time.monotonic_ns())
+    for _ in range(1000):
+        main.handle_cmd("lap", state)
+    return state
+
+@produces(*(f"handle_cmd[{cmd}]" for cmd in COMMANDS))
+def bench_commands(results):
+    for cmd in COMMANDS:
+        if not results.wants(f"handle_cmd[{cmd}]"):
+            continue
+        state = _command_state()  # Estado novo por comando: um não contamina a medição do outro
+        results.measure(f"handle_cmd[{cmd}]", lambda cmd=cmd, state=state: main.handle_cmd(cmd, state))
+
+
+def _mode_states(now):
+    zones = main.available_timezones()[:WORLD_ZONES]
+
+    clock = main.default_state()
+    stopwatch = dict(main.default_state(), mode="stopwatch", stopwatch_start=time.monotonic_ns() - 3600 * 10**9)
+    for _ in range(STOPWATCH_LAPS):
+        main.handle_cmd("lap", stopwatch)
+    timer = dict(main.default_state(), mode="timer", timer_duration=3600, timer_end=now + timedelta(hours=1))
+    pomodoro = dict(main.default_state(), mode="pomodoro", pomodoro_end=now + timedelta(minutes=25))
+    worldclock = dict(main.default_state(), mode="worldclock", world_clocks=zones)
+    # Mural com quatro painéis: cronômetro e pomodoro rodando ao lado do relógio e dos fusos
+    layout = dict(main.default_state(), world_clocks=zones[:20])
+    for cmd in ("layout clock stopwatch pomodoro worldclock", "focus 2", "start", "focus 3", "start"):
+        main.handle_cmd(cmd, main.focused_pane(layout))
+    states = {
+        "clock": clock, "stopwatch": stopwatch, "timer": timer,
+        "pomodoro": pomodoro, "worldclock": worldclock, "layout": layout,
+    }
+    return {mode: states[mode] for mode in FRAME_STATES}
+
+FRAME_STATES = ("clock", "stopwatch", "timer", "pomodoro", "worldclock", "layout")
+
+@produces(*(f"frame[{mode}]" for mode in FRAME_STATES))
+def bench_frames(results):
+    h, w = FRAME_SIZE
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    for mode, state in _mode_states(base).items():
+        if not results.wants(f"frame[{mode}]"):
+            continue
+        screen = FakeScreen(h, w)
+        renderer = main.FrameRenderer(screen)
+        tick = [0]
+
+        mono_base = time.monotonic_ns()
+
+        def frame(state=state, renderer=renderer):
+            # Um frame por "segundo" simulado, como no loop real
+            now = base + timedelta(seconds=tick[0])
+            mono = mono_base + tick[0] * 10**9
+            tick[0] += 1
+            renderer.draw(main.compose_layout(state, now, h, w, mono_ns=mono))
+
+        frame()  # Primeiro frame (repaint completo) fora da medição
+        ops = measure(frame)
+        screen.bytes_written = 0
+        for _ in range(60):
+            frame()
+        results[f"frame[{mode}]"] = {"ops": ops, "bytes_per_frame": screen.bytes_written / 60}
+
+
+@produces("config[save+load]")
+def bench_config(results):
+    state = dict(main.default_state(), world_clocks=["Europe/London", "Asia/Tokyo", "America/Sao_Paulo"])
+    with tempfile.TemporaryDirectory() as tmp:
+        original = main.CONFIG_FILE
+        main.CONFIG_FILE = os.path.join(tmp, "config.json")
+        try:
+            def round_trip():
+                main.save_config(state)
+                main.load_config()
+            results.measure("config[save+load]", round_trip)
+        finally:
+            main.CONFIG_FILE = original
+
+
+@produces("metrics[record]", "metrics[hud]")
+def bench_metrics(results):
+    """Custo por frame da instrumentação do loop (deve ficar desprezível perto de frame[*])."""
+    metrics = main.Metrics()
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    frame = main.Frame(*FRAME_SIZE)
+
+    def bookkeeping():
+        metrics.wakeup()
+        metrics.record("render_ms", 0.5)
+        metrics.record("bytes", 40)
+        metrics.record("getch_ms", 0.01)
+        metrics.frame_shown(now)
+
+    results.measure("metrics[record]", bookkeeping)
+    results.measure("metrics[hud]", lambda: main.draw_hud(frame, metrics))
+
+
+@produces("control[reply]")
+def bench_control(results):
+    """Resposta do socket de controle sem o transporte: comando e retrato do estado em JSON."""
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    state = _mode_states(now)["stopwatch"]
+
+    def reply():
+        reply = main.handle_cmd("mode stopwatch", state)
+        json.dumps({"cmd": "mode stopwatch", "reply": reply, "state": main.state_snapshot(state, now)})
+
+    results.measure("control[reply]", reply)
+
+
+@produces("input[paste]")
+def bench_input(results):
+    """Um comando longo colado (bracketed paste): um único lote de teclas até o buffer."""
+    app = main.ClockApp(None, main.default_state(), None)
+    keys = list(b"\x1b[200~[add tz America/Argentina/Buenos_Aires]\x1b[201~")
+
+    def paste():
+        app.input_buffer = ""
+        app.feed_keys(keys)
+
+    results.measure("input[paste]", paste)
+
+
+@produces("tz[index-load]", "tz[resolve]", "tz[search]", "tz[complete]")
+def bench_tz(results):
+    """Índice de fusos: carga do cache em disco, resolução de apelidos, busca aproximada e Tab."""
+    with tempfile.TemporaryDirectory() as tmp:
+        original = main.TZ_INDEX_FILE
+        main.TZ_INDEX_FILE = os.path.join(tmp, "tzindex.json")
+        try:
+            main._tz_index = None
+            main.tz_index()  # Monta e grava o cache
+
+            def load():
+                main._tz_index = None
+                main.tz_index()
+
+            results.measure("tz[index-load]", load)
+        finally:
+            main.TZ_INDEX_FILE = original
+    index = main.tz_index()
+    results.measure("tz[resolve]", lambda: index.resolve("nyc"))
+    results.measure("tz[search]", lambda: index.search("sao paolo"))
+    results.measure("tz[complete]", lambda: main.complete_command("add tz buen"))
+
+
+@produces("status[publish]", "status[read]")
+def bench_status(results):
+    """Publicação do arquivo de status (por tick) e a leitura + formatação do lado do tmux."""
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    state = dict(_mode_states(now)["pomodoro"], world_clocks=main.available_timezones()[:clockstatus.MAX_ZONES])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "status")
+        writer = clockstatus.StatusWriter(path)
+        try:
+            results.measure("status[publish]", lambda: writer.publish(*main.status_fields(state, now)))
+            results.measure("status[read]", lambda: clockstatus.format_status(clockstatus.read_status(path)))
+        finally:
+            writer.close()
+
+
+@produces("history[record]", "history[stats]")
+def bench_history(results):
+    """Custo de registrar um evento (só enfileira) e de uma consulta de stats com três anos de índice."""
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    today = now.date()
+    with tempfile.TemporaryDirectory() as tmp:
+        original = main.HISTORY_FILE, main.HISTORY_INDEX
+        main.HISTORY_FILE, main.HISTORY_INDEX = os.path.join(tmp, "history.log"), os.path.join(tmp, "history.idx.json")
+        try:
+            history = main.HistoryLog()
+            for day in range(3 * 365):
+                for minute in range(0, 100, 25):
+                    history.record("pomodoro", now - timedelta(days=day, minutes=minute), 1500)
+            history.close()
+            main.history_days()  # Primeira leitura: monta o índice a partir do log
+            results.measure("history[record]", lambda: history.record("timer", now, 60))
+            history.close()
+            results.measure("history[stats]", lambda: main.history_stats("month", today, main.history_days()))
+        finally:
+            main.HISTORY_FILE, main.HISTORY_INDEX = original
+
+
+@produces("startup")
+def bench_startup(results):
+    """Inicialização até o primeiro frame, num processo novo (imports frios) e com HOME vazio."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    best = None
+    with tempfile.TemporaryDirectory() as home:
+        for _ in range(STARTUP_RUNS):
+            start = time.perf_counter()
+            out = subprocess.run(
+                [sys.executable, script, "--headless", "--size", "80x24", "--output", os.devnull,
+                 "--startup-profile", "json"],
+                capture_output=True, text=True, env=dict(os.environ, HOME=home),
+            ).stdout
+            wall_ms = (time.perf_counter() - start) * 1000
+            profile = json.loads(out)
+            if best is None or profile["total_ms"] < best["total_ms"]:
+                best = dict(profile, wall_ms=wall_ms)
+    results["startup"] = {
+        "ops": 1000 / best["wall_ms"],
+        "startup_ms": best["total_ms"],
+        "wall_ms": best["wall_ms"],
+        "budget_ms": best["budget_ms"],
+    }
+
+
+BENCHMARKS = [
+    bench_render, bench_commands, bench_frames, bench_config, bench_metrics, bench_control, bench_input,
+    bench_tz, bench_status, bench_history, bench_startup,
+]
+
+
+# --- Baseline ---
+def compare(results, baseline, tolerance):
+    """Retorna a lista de regressões (texto) em relação ao baseline."""
+    regressions = []
+    for name, result in results.items():
+        ref = baseline.get(name)
+        if not ref:
+            continue
+        if result["ops"] < ref["ops"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['ops']:.0f} ops/s (baseline {ref['ops']:.0f})")
+        if "bytes_per_frame" in ref and result.get("bytes_per_frame", 0) > ref["bytes_per_frame"] * (1 + tolerance) + 1:
+            regressions.append(f"{name}: {result['bytes_per_frame']:.0f} B/frame (baseline {ref['bytes_per_frame']:.0f})")
+    startup = results.get("startup")
+    if startup and startup["startup_ms"] > startup["budget_ms"]:
+        # Orçamento absoluto: vale mesmo sem baseline
+        regressions.append(f"startup: {startup['startup_ms']:.1f} ms (budget {startup['budget_ms']:.0f} ms)")
+    return regressions
+
+def report(results, baseline):
+    print(f"{'benchmark':<44} {'ops/s':>12} {'B/frame':>9} {'vs baseline':>12}")
+    for name, result in results.items():
+        ref = baseline.get(name)
+        delta = f"{(result['ops'] / ref['ops'] - 1) * 100:+.1f}%" if ref else "-"
+        bpf = f"{result['bytes_per_frame']:.0f}" if "bytes_per_frame" in result else ""
+        print(f"{name:<44} {result['ops']:>12.0f} {bpf:>9} {delta:>12}")
+    if "startup" in results:
+        st = results["startup"]
+        print(f"startup: {st['startup_ms']:.1f} ms até o primeiro frame ({st['wall_ms']:.1f} ms com o interpretador), "
+              f"budget {st['budget_ms']:.0f} ms")
+
+
+def main_bench(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="roda só os benchmarks cujo nome contém o texto")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="arquivo de baseline (JSON)")
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados como novo baseline")
+    parser.add_argument("--tolerance", type=float, default=0.35, help="queda/aumento tolerado (padrão: 0.35 = 35%%)")
+    parser.add_argument("--json", help="grava os resultados neste arquivo JSON")
+    args = parser.parse_args(argv)
+
+    main.set_color_pairs(main.headless_color_pairs())
+    results = Results(args.filter)
+    with tempfile.TemporaryDirectory() as home:
+        # Os comandos (add tz, find tz...) não podem gravar no HOME de quem roda o bench
+        original = {name: getattr(main, name) for name in HOME_FILES}
+        for name, path in original.items():
+            setattr(main, name, os.path.join(home, os.path.basename(path)))
+        try:
+            for bench in BENCHMARKS:
+                if results.wants(*bench.names):
+                    bench(results)
+        finally:
+            for name, path in original.items():
+                setattr(main, name, path)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        if args.filter and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                results = dict(json.load(f), **results)  # Com --filter, atualiza só os benchmarks medidos
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline salvo em {args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print("REGRESSÃO:", line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_bench())
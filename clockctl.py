@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Cliente da API de controle do relógio: envia comandos a uma instância aberta.
+
+Uso:
+    python3 clockctl.py set timer 10m      # imprime a resposta
+    python3 clockctl.py --json mode timer  # imprime a resposta e o estado (JSON)
+    echo "alarms" | python3 clockctl.py -  # um comando por linha do stdin
+
+Só usa a biblioteca padrão e não importa curses nem argparse, para responder em
+poucos milissegundos. O mesmo cliente roda como `python3 main.py ctl ...`.
+"""
+import json
+import socket
+import sys
+import clockpaths
+from clockpaths import CONTROL_SOCKET
+
+TIMEOUT = 5.0
+
+def request(commands, path=CONTROL_SOCKET, timeout=TIMEOUT):
+    """Envia os comandos (um por linha) e retorna as respostas decodificadas, na mesma ordem."""
+    clockpaths.check_owner(path)  # Um socket de outro usuário receberia os comandos
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall("".join(cmd.replace("\n", " ") + "\n" for cmd in commands).encode("utf-8"))
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    path, as_json = CONTROL_SOCKET, False
+    while args and args[0].startswith("--"):
+        opt = args.pop(0)
+        if opt == "--json":
+            as_json = True
+        elif opt == "--socket" and args:
+            path = args.pop(0)
+        else:
+            print(f"Opção desconhecida: {opt}", file=sys.stderr)
+            return 2
+    if not args:
+        print(__doc__.strip().split("\n\n")[1], file=sys.stderr)
+        return 2
+    commands = sys.stdin.read().splitlines() if args == ["-"] else [" ".join(args)]
+    try:
+        replies = request([cmd for cmd in commands if cmd.strip()], path)
+    except (OSError, ValueError) as e:
+        print(f"Relógio não encontrado em {path}: {e}", file=sys.stderr)
+        return 1
+    for reply in replies:
+        print(json.dumps(reply) if as_json else reply["reply"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
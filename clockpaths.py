@@ -0,0 +1,38 @@
+"""Caminhos de execução compartilhados por main.py, clockctl.py e clockstatus.py.
+
+Fica num módulo à parte, só com `os`, para quem precisa dos caminhos não
+importar `socket` nem `mmap` à toa. Sem XDG_RUNTIME_DIR, o socket e o status
+ficam num diretório próprio do usuário (0700) dentro do /tmp, e não direto
+nele, onde outro usuário poderia criar o arquivo antes.
+"""
+import errno
+import os
+import stat
+
+PRIVATE_DIR = os.path.join(os.environ.get("TMPDIR") or "/tmp", f"py_clock-{os.getuid()}")
+RUNTIME_DIR = os.environ.get("XDG_RUNTIME_DIR") or PRIVATE_DIR
+CONTROL_SOCKET = os.environ.get("PY_CLOCK_SOCKET") or os.path.join(RUNTIME_DIR, f"py_clock-{os.getuid()}.sock")
+STATUS_FILE = os.environ.get("PY_CLOCK_STATUS") or os.path.join(RUNTIME_DIR, f"py_clock-{os.getuid()}.status")
+
+
+def check_owner(path):
+    """Levanta PermissionError se `path` existir e for um link ou de outro usuário."""
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if stat.S_ISLNK(st.st_mode) or st.st_uid != os.getuid():
+        raise PermissionError(errno.EACCES, "pertence a outro usuário (ou é um link)", path)
+
+def prepare(path):
+    """Antes de criar `path`: cria o diretório privado, se for ele, e confere os donos."""
+    parent = os.path.dirname(path)
+    if parent == PRIVATE_DIR:
+        try:
+            os.mkdir(parent, 0o700)
+        except FileExistsError:
+            pass
+        st = os.lstat(parent)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+            raise PermissionError(errno.EACCES, "diretório inseguro (de outro usuário ou aberto)", parent)
+    check_owner(path)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Arquivo de status em memória compartilhada: layout fixo, escritor e leitor leve.
+
+O relógio (`main.py --daemon` ou `--status-file`) publica o estado a cada tick
+num arquivo mapeado em memória; barras do tmux e prompts leem daqui sem
+importar curses, pytz nem a configuração:
+
+    python3 -S clockstatus.py                  # texto conforme o modo
+    python3 -S clockstatus.py '{pomodoro}'     # formato próprio
+    python3 -S clockstatus.py --json
+
+Campos do formato: {time} {mode} {timer} {pomodoro} {phase} {cycles}
+{stopwatch} {alarm} {zones} {msg}. Os tempos restantes são calculados na
+leitura a partir dos instantes de término, então ficam certos entre ticks.
+O escritor usa um seqlock: o contador é ímpar durante a escrita, e o leitor
+tenta de novo se o contador mudou durante a cópia.
+"""
+import errno
+import mmap
+import os
+import struct
+import sys
+import time
+import clockpaths
+from clockpaths import STATUS_FILE
+
+MAGIC = b"PYCK"
+VERSION = 1
+MODES = ("clock", "stopwatch", "timer", "pomodoro", "worldclock")
+PHASES = ("work", "break")
+KINDS = ("", "alarm", "countdown")
+MAX_ZONES = 16
+STALE_AFTER = 5.0  # segundos sem atualização até o status ser marcado como velho
+
+# magic, versão, seq, updated, modo, fase, tipo do próximo disparo, flags,
+# timer_end, timer_remaining, pomodoro_end, pomodoro_remaining, pomodoro_cycles,
+# stopwatch_elapsed, alarm_at, alarm_name, msg, zone_count
+SEQ = struct.Struct("<I")
+SEQ_OFFSET = 6
+HEADER = struct.Struct("<4sHIdBBBBdidiIdd24s64sB")
+ZONE = struct.Struct("<32sid")  # nome, offset UTC (s), válido até (epoch)
+SIZE = HEADER.size + MAX_ZONES * ZONE.size
+FLAG_TIMER_RUNNING = 1
+FLAG_TIMER_PAUSED = 2
+FLAG_STOPWATCH_RUNNING = 4
+
+
+class StatusWriter:
+    """Lado do relógio: mantém o arquivo mapeado e publica com o seqlock."""
+
+    def __init__(self, path=STATUS_FILE):
+        self.path = path
+        clockpaths.prepare(path)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        try:
+            if os.fstat(fd).st_uid != os.getuid():  # Criado por outro usuário entre a checagem e o open
+                raise PermissionError(errno.EACCES, "pertence a outro usuário", path)
+            os.ftruncate(fd, SIZE)
+            self.map = mmap.mmap(fd, SIZE)
+        finally:
+            os.close(fd)
+        self.seq = SEQ.unpack_from(self.map, SEQ_OFFSET)[0] & ~1
+
+    def publish(self, status, zones=()):
+        """Grava `status` (dict com os campos do HEADER) e até MAX_ZONES (nome, offset, válido até)."""
+        self.seq += 1
+        SEQ.pack_into(self.map, SEQ_OFFSET, self.seq)  # Ímpar: escrita em andamento
+        flags = ((FLAG_TIMER_RUNNING if status["timer_running"] else 0)
+                 | (FLAG_TIMER_PAUSED if status["timer_paused"] else 0)
+                 | (FLAG_STOPWATCH_RUNNING if status["stopwatch_running"] else 0))
+        zones = zones[:MAX_ZONES]
+        HEADER.pack_into(
+            self.map, 0, MAGIC, VERSION, self.seq, status["updated"],
+            MODES.index(status["mode"]), PHASES.index(status["pomodoro_phase"]), KINDS.index(status["alarm_kind"]), flags,
+            status["timer_end"], status["timer_remaining"], status["pomodoro_end"], status["pomodoro_remaining"],
+            status["pomodoro_cycles"], status["stopwatch_elapsed"], status["alarm_at"],
+            status["alarm_name"].encode("utf-8")[:24], status["msg"].encode("utf-8")[:64], len(zones),
+        )
+        for i, (name, offset, valid_until) in enumerate(zones):
+            ZONE.pack_into(self.map, HEADER.size + i * ZONE.size, name.encode("utf-8")[:32], offset, valid_until)
+        self.seq += 1
+        SEQ.pack_into(self.map, SEQ_OFFSET, self.seq)
+
+    def close(self):
+        self.map.close()
+
+
+def read_status(path=STATUS_FILE, retries=100):
+    """Lê um retrato consistente do arquivo; None se ele não existir ou não for de um relógio."""
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW)
+    except OSError:
+        return None
+    try:
+        if os.fstat(fd).st_uid != os.getuid():
+            return None  # Arquivo plantado por outro usuário: o conteúdo não é confiável
+        data = mmap.mmap(fd, SIZE, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    finally:
+        os.close(fd)
+    with data:
+        for _ in range(retries):
+            seq = SEQ.unpack_from(data, SEQ_OFFSET)[0]
+            if seq & 1:
+                continue  # Escritor no meio da publicação
+            raw = data[:SIZE]
+            if SEQ.unpack_from(data, SEQ_OFFSET)[0] == seq:
+                break
+        else:
+            return None
+    (magic, version, _, updated, mode, phase, kind, flags, timer_end, timer_remaining, pomodoro_end,
+     pomodoro_remaining, cycles, stopwatch_elapsed, alarm_at, alarm_name, msg, zone_count) = HEADER.unpack_from(raw)
+    if magic != MAGIC or version != VERSION:
+        return None
+    zones = []
+    for i in range(min(zone_count, MAX_ZONES)):
+        name, offset, valid_until = ZONE.unpack_from(raw, HEADER.size + i * ZONE.size)
+        zones.append((name.rstrip(b"\0").decode("utf-8", "replace"), offset, valid_until))
+    return {
+        "updated": updated, "mode": MODES[mode], "pomodoro_phase": PHASES[phase], "alarm_kind": KINDS[kind],
+        "timer_running": bool(flags & FLAG_TIMER_RUNNING), "timer_paused": bool(flags & FLAG_TIMER_PAUSED),
+        "stopwatch_running": bool(flags & FLAG_STOPWATCH_RUNNING),
+        "timer_end": timer_end, "timer_remaining": timer_remaining, "pomodoro_end": pomodoro_end,
+        "pomodoro_remaining": pomodoro_remaining, "pomodoro_cycles": cycles, "stopwatch_elapsed": stopwatch_elapsed,
+        "alarm_at": alarm_at, "alarm_name": alarm_name.rstrip(b"\0").decode("utf-8", "replace"),
+        "msg": msg.rstrip(b"\0").decode("utf-8", "replace"), "zones": zones,
+    }
+
+
+# --- Formatting (leitor) ---
+def _clock(seconds):
+    seconds = max(int(seconds), 0)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+def fields(status, now=None):
+    """Campos de texto para o formato, com os tempos restantes calculados para `now`."""
+    now = time.time() if now is None else now
+    timer = status["timer_end"] - now if status["timer_running"] else status["timer_remaining"]
+    pomodoro = status["pomodoro_end"] - now if status["pomodoro_end"] else status["pomodoro_remaining"]
+    stopwatch = status["stopwatch_elapsed"] + (now - status["updated"] if status["stopwatch_running"] else 0)
+    alarm = ""
+    if status["alarm_kind"]:
+        name = "" if status["alarm_name"] == "alarm" else status["alarm_name"] + " "
+        alarm = f"{status['alarm_kind']} {name}" + (
+            _clock(status["alarm_at"] - now) if status["alarm_kind"] == "countdown"
+            else time.strftime("%H:%M", time.localtime(status["alarm_at"])))
+    zones = []
+    for name, offset, valid_until in status["zones"]:
+        secs = int(now + offset) % 86400
+        mark = "?" if now >= valid_until else ""  # Transição de horário de verão ainda não publicada
+        zones.append(f"{name.rsplit('/', 1)[-1].replace('_', ' ')} {secs // 3600:02d}:{secs % 3600 // 60:02d}{mark}")
+    return {
+        "time": time.strftime("%H:%M", time.localtime(now)),
+        "mode": status["mode"],
+        "timer": _clock(timer),
+        "pomodoro": f"{status['pomodoro_phase']} {_clock(pomodoro)} #{status['pomodoro_cycles']}",
+        "phase": status["pomodoro_phase"],
+        "cycles": status["pomodoro_cycles"],
+        "stopwatch": _clock(stopwatch),
+        "alarm": alarm,
+        "zones": " | ".join(zones),
+        "msg": status["msg"],
+    }
+
+DEFAULT_FORMATS = {
+    "clock": "{time}", "stopwatch": "sw {stopwatch}", "timer": "timer {timer}",
+    "pomodoro": "{pomodoro}", "worldclock": "{zones}",
+}
+
+def format_status(status, fmt=None, now=None):
+    now = time.time() if now is None else now
+    text = (fmt or DEFAULT_FORMATS[status["mode"]]).format_map(fields(status, now))
+    if now - status["updated"] > STALE_AFTER and status["mode"] != "clock":
+        text += " (stale)"  # O relógio parou de publicar: os tempos podem estar errados
+    return text
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    path = STATUS_FILE
+    if args[:1] == ["--file"] and len(args) > 1:
+        path, args = args[1], args[2:]
+    status = read_status(path)
+    if status is None:
+        return 1
+    if args[:1] == ["--json"]:
+        import json
+        print(json.dumps(dict(status, **fields(status))))
+    else:
+        print(format_status(status, args[0] if args else None))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,26 @@
 #!/usr/bin/env python3
-import curses
 import time
+_T0 = time.perf_counter()  # Início do carregamento do módulo (para --startup-profile)
+import argparse
+import bisect
+import clockpaths
+import clockstatus
+import curses
+import functools
+import heapq
+import itertools
 import json
+import operator
 import os
 import random
-from datetime import datetime, timedelta
-
-try:
-    import pytz
-except ImportError:
-    print("Erro: A biblioteca 'pytz' é necessária. Por favor, instale-a com 'pip install pytz'")
-    exit(1)
+import shutil
+import signal
+import sys
+import tempfile
+from array import array
+from collections.abc import MutableMapping
+from datetime import date, datetime, timedelta
+_T_IMPORTS = time.perf_counter()
 
 # --- ASCII DIGITS (refined for better symmetry and style) ---
 BLOCK = "█"
@@ -28,6 +38,7 @@ DIGITS = {
     "8": ["█████", "█   █", "█   █", "█████", "█   █", "█   █", "█████"],
     "9": ["█████", "█   █", "█   █", "█████", "    █", "    █", "█████"],
     ":": ["     ", "  █  ", "  █  ", "     ", "  █  ", "  █  ", "     "],
+    ".": ["     ", "     ", "     ", "     ", "     ", " ██  ", " ██  "],
     "A": [" ███ ", "█   █", "█   █", "█████", "█   █", "█   █", "█   █"],
     "M": ["█   █", "██ ██", "█ █ █", "█   █", "█   █", "█   █", "█   █"],
     "P": ["█████", "█   █", "█   █", "█████", "█    ", "█    ", "█    "],
@@ -46,22 +57,86 @@ QUOTES = [
 ]
 CONFIG_FILE = os.path.expanduser("~/.py_clock_config.json")
 
-def render_time_string(timestr, color_pair, random_mode=False):
-    rows = [""] * 7
-    for char in timestr:
-        glyph = DIGITS.get(char, DIGITS[" "])
-        for i, line in enumerate(glyph):
-            rows[i] += line + "  "
+# --- Scalable fonts ---
+# O tamanho da fonte é a altura de cada pixel do DIGITS em meios-blocos. A largura
+# acompanha em colunas inteiras (ceil(tamanho / 2)), exceto no tamanho 1, que usa
+# quadrantes (meia coluna por pixel) para caber em painéis estreitos.
+FONT_BASE = 2  # 1 célula por pixel: o DIGITS original, 7 linhas de altura
+FONT_MAX = 8
+LAP_RESERVE = 4  # Linhas mantidas livres para o resumo e as últimas voltas do cronômetro
+QUADRANTS = " ▗▖▄▝▐▞▟▘▚▌▙▀▜▛█"  # Índice: bits (sup. esq., sup. dir., inf. esq., inf. dir.)
+
+def _font_scale(size):
+    """(meias-colunas por pixel, colunas de espaçamento entre glifos)."""
+    half_cols = 1 if size == 1 else 2 * ((size + 1) // 2)
+    return half_cols, half_cols // 2 + 1
+
+def font_metrics(size):
+    """(altura em linhas, largura por caractere com o espaçamento) do tamanho dado."""
+    half_cols, gap = _font_scale(size)
+    return (7 * size + 1) // 2, (5 * half_cols + 1) // 2 + gap
+
+@functools.lru_cache(maxsize=None)
+def font_atlas(size):
+    """Atlas do tamanho dado: para cada caractere, as linhas já com o espaçamento entre glifos."""
+    half_cols, gap = _font_scale(size)
+    atlas = {}
+    for char, glyph in DIGITS.items():
+        # Bitmap em meias-células, arredondado para pares de linhas e colunas
+        bitmap = ["".join(pixel * half_cols for pixel in row) for row in glyph for _ in range(size)]
+        width = len(bitmap[0]) + len(bitmap[0]) % 2
+        bitmap = [row.ljust(width) for row in bitmap]
+        if len(bitmap) % 2:
+            bitmap.append(SPACE * width)
+        atlas[char] = tuple(
+            "".join(QUADRANTS[(top[x] != SPACE) << 3 | (top[x + 1] != SPACE) << 2
+                              | (bottom[x] != SPACE) << 1 | (bottom[x + 1] != SPACE)]
+                    for x in range(0, width, 2)) + SPACE * gap
+            for top, bottom in zip(bitmap[0::2], bitmap[1::2])
+        )
+    return atlas
+
+@functools.lru_cache(maxsize=64)
+def pick_font_size(rows, cols, chars):
+    """Maior tamanho cujo texto de `chars` caracteres cabe em rows x cols, ou None (modo compacto).
+
+    Depende só das dimensões, então é recalculado apenas quando o terminal muda de tamanho.
+    """
+    for size in range(FONT_MAX, 0, -1):
+        height, width = font_metrics(size)
+        if height <= rows and width * chars - _font_scale(size)[1] <= cols:  # Sem o espaço após o último glifo
+            return size
+    return None
+
+GLYPH_ATLAS = font_atlas(FONT_BASE)
+GLYPH_HEIGHT, GLYPH_WIDTH = font_metrics(FONT_BASE)
+palette = ()  # Pares de cor para o modo "random", preenchido após curses.start_color()
+
+@functools.lru_cache(maxsize=128)
+def _glyph_rows(timestr, size=FONT_BASE):
+    atlas = font_atlas(size)
+    blank = atlas[" "]
+    glyphs = [atlas.get(char, blank) for char in timestr]
+    return tuple("".join(glyph[i] for glyph in glyphs) for i in range(len(blank)))
+
+@functools.lru_cache(maxsize=128)
+def render_time_string(timestr, color_pair, random_mode=False, size=FONT_BASE):
+    rows = _glyph_rows(timestr, size)
     if random_mode:
-        return [(random.choice(list(pair_map.values())), line) for line in rows]
-    else:
-        return [(color_pair, line) for line in rows]
+        # Cores sorteadas uma vez por texto: o mesmo texto devolve o mesmo resultado em cache
+        return tuple((random.choice(palette), line) for line in rows)
+    return tuple((color_pair, line) for line in rows)
+
+MAX_DURATION = 366 * 86400  # Mais que isso estoura o datetime do prazo (e não faz sentido num timer)
 
 def parse_time_str(s):
-    if s.endswith("h"): return int(s[:-1]) * 3600
-    if s.endswith("m"): return int(s[:-1]) * 60
-    if s.endswith("s"): return int(s[:-1])
-    return int(s)
+    if s.endswith("h"): secs = int(s[:-1]) * 3600
+    elif s.endswith("m"): secs = int(s[:-1]) * 60
+    elif s.endswith("s"): secs = int(s[:-1])
+    else: secs = int(s)
+    if abs(secs) > MAX_DURATION:
+        raise ValueError(s)
+    return secs
 
 def parse_alarm_time(s):
     try:
@@ -74,412 +149,2786 @@ def parse_alarm_time(s):
     except:
         return None
 
-def load_config():
-    """Carrega a configuração do arquivo JSON."""
+CONFIG_KEYS = [
+    "show_seconds", "h12", "color", "show_date", "show_quote", "blink_colon", "minimal_mode",
+    "pomodoro_work", "pomodoro_break", "world_clocks", "low_power", "wc_sort", "wc_group", "hud",
+    "command_history", "layout",
+]
+SAVE_DEBOUNCE = 2.0  # segundos de inatividade antes de gravar o arquivo
+
+def _read_config_raw():
     if not os.path.exists(CONFIG_FILE):
         return {}
     try:
         with open(CONFIG_FILE, 'r') as f:
-            config = json.load(f)
-            # Converte strings de alarme e fusos horários de volta para os tipos corretos
-            if config.get("alarm_time"):
-                config["alarm_time"] = datetime.fromisoformat(config["alarm_time"])
-            return config
+            return json.load(f)
     except (json.JSONDecodeError, IOError):
         return {}
 
+def _decode_config(config):
+    # Converte a agenda salva de volta para o Scheduler
+    if "schedule" in config:
+        config["scheduler"] = Scheduler.from_config(config.pop("schedule"))
+    alarm_time = config.pop("alarm_time", None)
+    if alarm_time:
+        # Formato antigo: um único alarme em "alarm_time"
+        scheduler = config.setdefault("scheduler", Scheduler())
+        when = datetime.fromisoformat(alarm_time)
+        scheduler.add(Job("alarm", "alarm", when, when.strftime("%H:%M")))
+    return config
+
+def load_config():
+    """Carrega a configuração do arquivo JSON."""
+    return _decode_config(_read_config_raw())
+
+def config_snapshot(state):
+    """Extrai do estado apenas as chaves persistentes, já serializáveis em JSON."""
+    config = {key: state[key] for key in CONFIG_KEYS if key in state}
+    if "scheduler" in state:
+        config["schedule"] = state["scheduler"].to_config()
+    return config
+
+def _serialize_config(state):
+    return json.dumps(config_snapshot(state), indent=2)
+
+def _write_atomic(path, text):
+    """Grava num arquivo temporário no mesmo diretório e troca com os.replace."""
+    fd, tmp_path = tempfile.mkstemp(prefix=".py_clock_", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except OSError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.fchmod(fd, mode)  # mkstemp cria com 0600; mantém as permissões de um open() comum
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
 def save_config(state):
-    """Salva as configurações persistentes em um arquivo JSON."""
-    config_to_save = {
-        key: state[key] for key in [
-            "show_seconds", "h12", "color", "show_date", "show_quote", "blink_colon", "minimal_mode",
-            "pomodoro_work", "pomodoro_break", "world_clocks"
-        ] if key in state
-    }
-    if state.get("alarm_time"):
-        config_to_save["alarm_time"] = state["alarm_time"].isoformat()
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config_to_save, f, indent=2)
-
-def main(stdscr):
-    curses.curs_set(0)  # Hide cursor for better style
-    curses.start_color()
-    curses.use_default_colors()
-    global pair_map
-    pair_map = {}
-    for idx, name in enumerate(COLOR_MAP.keys(), start=1):
-        curses.init_pair(idx, COLOR_MAP[name], -1)
-        pair_map[name] = curses.color_pair(idx)
-
-    saved_config = load_config()
-    state = {
-        "mode": "clock", "show_seconds": True, "h12": False, "color": "cyan", "show_date": False,
-        "stopwatch_start": None, "stopwatch_elapsed": 0, "laps": [],
-        "timer_end": None, "timer_duration": 0, "timer_paused": False, "timer_remaining": 0,
-        "alarm_time": None, "alarm_triggered": False,
-        "pomodoro_phase": "work", "pomodoro_end": None, "pomodoro_cycles": 0, "pomodoro_work": 25 * 60, "pomodoro_break": 5 * 60,
-        "show_quote": False, "blink_colon": True,
-        "world_clocks": [], "minimal_mode": False
-    }
-    state.update(saved_config)
+    """Salva as configurações persistentes em um arquivo JSON (escrita atômica)."""
+    _write_atomic(CONFIG_FILE, _serialize_config(state))
 
-    input_buffer = ""
-    msg = ""
-    blink = False
-    last_beep = None
-    quote_index = 0
+def _config_mtime():
+    try:
+        return os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        return None
 
-    while True:
-        stdscr.erase()
-        h, w = stdscr.getmaxyx()
-        now = datetime.now()
+# --- Merge entre instâncias (base: o último arquivo visto; local: o estado; remoto: o arquivo novo) ---
+def _merge_jobs(base, local, remote):
+    """Agenda, job a job pelo nome: fica a versão que mudou; se os dois lados mudaram, a local."""
+    base, local, remote = ({job["name"]: job for job in jobs or ()} for jobs in (base, local, remote))
+    merged = []
+    for name in sorted(set(base) | set(local) | set(remote)):
+        job = remote.get(name) if local.get(name) == base.get(name) else local.get(name)
+        if job:
+            merged.append(job)
+    return merged
 
-        # --- Handle blinking and beeping ---
-        blink = (now.second % 2 == 0)
-        finished_blink = False
-        if state["mode"] == "timer" and state["timer_end"] and (state["timer_end"] - now).total_seconds() <= 0:
-            if not last_beep or (now - last_beep).total_seconds() > 1:
-                curses.beep()
-                last_beep = now
-            finished_blink = True
-        if state["alarm_time"] and now >= state["alarm_time"] and not state["alarm_triggered"]:
-            curses.beep()
-            msg = "Alarm triggered!"
-            state["alarm_triggered"] = True
-
-        # --- Build numeric time string ---
-        colon = ":" if (state["blink_colon"] or not blink) else " "
-        numeric_timestr = ""
-        extra_text = ""
-        if state["mode"] == "clock":
-            hour = now.hour
-            if state["h12"]:
-                ampm = "AM" if hour < 12 else "PM"
-                hour = hour % 12 or 12
-                extra_text = ampm
-            numeric_timestr = f"{hour:02d}{colon}{now.minute:02d}"
-            if state["show_seconds"]:
-                numeric_timestr += f"{colon}{now.second:02d}"
-        elif state["mode"] == "stopwatch":
-            elapsed = state["stopwatch_elapsed"]
-            if state["stopwatch_start"]:
-                elapsed += (now - state["stopwatch_start"]).total_seconds()
-            m, s = divmod(int(elapsed), 60)
-            h2, m = divmod(m, 60)
-            numeric_timestr = f"{h2:02d}{colon}{m:02d}{colon}{s:02d}"
-        elif state["mode"] == "timer":
-            if state["timer_end"] and not state["timer_paused"]:
-                remaining = int((state["timer_end"] - now).total_seconds())
-                if remaining <= 0:
-                    remaining = 0
-                    finished_blink = True
-            elif state["timer_paused"]:
-                remaining = state["timer_remaining"]
-            else:
-                remaining = state["timer_duration"]
+def _merge_set(base, local, remote):
+    """Lista sem repetição (fusos): ordem local, sem o que o outro lado removeu, mais o que ele incluiu."""
+    base, local, remote = base or [], local or [], remote or []
+    return ([item for item in local if item in remote or item not in base]
+            + [item for item in remote if item not in base and item not in local])
+
+def _appended(base, items):
+    """Itens acrescentados ao fim de `items` desde `base`, cujo início pode ter sido cortado."""
+    for keep in range(len(items), 0, -1):
+        if items[:keep] == base[-keep:]:
+            return items[keep:]
+    return items
+
+def _merge_log(base, local, remote):
+    """Histórico de comandos: o local mais o que a outra instância acrescentou, com o mesmo limite."""
+    return (list(local or []) + _appended(base or [], remote or []))[-COMMAND_HISTORY:]
+
+CONFIG_MERGE = {"schedule": _merge_jobs, "world_clocks": _merge_set, "command_history": _merge_log}
+
+class ConfigStore:
+    """Persistência write-behind do arquivo de configuração.
+
+    As mudanças marcam o estado como sujo e são gravadas após SAVE_DEBOUNCE
+    segundos ou na saída. Gravações que não mudariam o arquivo são puladas, e
+    alterações feitas por outra instância (detectadas pelo mtime) são
+    incorporadas ao estado: numa chave alterada dos dois lados, a agenda e as
+    listas são mescladas (CONFIG_MERGE) e os demais valores ficam com o local.
+    """
+
+    def __init__(self, state, debounce=SAVE_DEBOUNCE):
+        self.state = state
+        self.debounce = debounce
+        self.dirty_since = None
+        self.saved = _serialize_config(state)
+        self.mtime = _config_mtime()
+
+    def mark_dirty(self):
+        if self.dirty_since is None:
+            self.dirty_since = time.monotonic()
+
+    def seconds_until_flush(self):
+        """Tempo até o próximo flush pendente, ou None se não há nada a gravar."""
+        if self.dirty_since is None:
+            return None
+        return max(self.dirty_since + self.debounce - time.monotonic(), 0)
+
+    def poll(self):
+        """Chamado a cada despertar do loop: sincroniza com o disco e grava se vencido.
+
+        Retorna True se o estado recebeu alterações de outra instância.
+        """
+        changed = self.sync_external()
+        if self.dirty_since is not None and time.monotonic() - self.dirty_since >= self.debounce:
+            self.flush()
+        return changed
+
+    def flush(self):
+        self.dirty_since = None
+        text = _serialize_config(self.state)
+        if text == self.saved:
+            return False
+        _write_atomic(CONFIG_FILE, text)
+        self.saved = text
+        self.mtime = _config_mtime()
+        return True
+
+    def sync_external(self):
+        mtime = _config_mtime()
+        if mtime is None or mtime == self.mtime:
+            return False
+        self.mtime = mtime
+        raw = _read_config_raw()
+        if not raw:
+            return False
+        base = json.loads(self.saved)
+        current = config_snapshot(self.state)
+        external = {}
+        for key, value in raw.items():
+            if value == base.get(key):
+                continue  # A outra instância não mexeu nesta chave
+            if current.get(key) == base.get(key):
+                external[key] = value
+            elif key in CONFIG_MERGE:
+                external[key] = CONFIG_MERGE[key](base.get(key), current.get(key), value)
+                self.mark_dirty()  # O resultado ainda não está no disco
+        self.state.update(_decode_config(external))
+        self.saved = json.dumps(raw, indent=2)
+        return True
+
+# --- Stopwatch (monotonic clock) ---
+STOPWATCH_REFRESH = 0.05  # Redesenho do cronômetro rodando (milissegundos visíveis)
+
+def format_ns(ns):
+    """Formata uma duração em ns como MM:SS.mmm (ou H:MM:SS.mmm)."""
+    s, ms = divmod(ns // 1_000_000, 1000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{s:02d}.{ms:03d}" if h else f"{m:02d}:{s:02d}.{ms:03d}"
+
+def stopwatch_elapsed_ns(state, mono_ns=None):
+    elapsed = state["stopwatch_elapsed"]
+    if state["stopwatch_start"] is not None:
+        elapsed += (time.monotonic_ns() if mono_ns is None else mono_ns) - state["stopwatch_start"]
+    return elapsed
+
+class Laps:
+    """Voltas do cronômetro: tempos acumulados (ns) num array compacto e estatísticas incrementais."""
+
+    def __init__(self):
+        self.times = array("q")
+        self.best = self.worst = None  # (número da volta, parcial em ns)
+        self.last_split = 0
+
+    def __len__(self):
+        return len(self.times)
+
+    def split(self, i):
+        """Parcial da volta de índice i (0-based)."""
+        return self.times[i] - (self.times[i - 1] if i else 0)
+
+    def append(self, cumulative_ns):
+        split = cumulative_ns - (self.times[-1] if self.times else 0)
+        self.times.append(cumulative_ns)
+        number = len(self.times)
+        if self.best is None or split < self.best[1]:
+            self.best = (number, split)
+        if self.worst is None or split > self.worst[1]:
+            self.worst = (number, split)
+        self.last_split = split
+
+    @property
+    def mean(self):
+        return self.times[-1] // len(self.times) if self.times else 0
+
+    def summary(self):
+        if not self.times:
+            return "No laps"
+        return (f"Laps: {len(self.times)} | best #{self.best[0]} {format_ns(self.best[1])}"
+                f" | worst #{self.worst[0]} {format_ns(self.worst[1])} | mean {format_ns(self.mean)}"
+                f" | last {format_ns(self.last_split)}")
+
+    def format_row(self, i):
+        return f"#{i + 1:<6} {format_ns(self.times[i])}  +{format_ns(self.split(i))}"
+
+# --- Scheduler (alarms and countdowns) ---
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+REPEATS = {"daily": range(7), "weekdays": range(5), "weekends": (5, 6)}
+MISSED_GRACE = 60  # segundos de atraso a partir dos quais um disparo conta como perdido
+ALARM_RECHECK = 60  # intervalo máximo (s) entre revisões da agenda pela tarefa de alarmes
+
+def parse_repeat(spec):
+    """Valida uma recorrência: daily, weekdays, weekends ou dias como "mon,wed,fri"."""
+    if spec in REPEATS:
+        return spec
+    days = spec.lower().split(",")
+    if not all(day in WEEKDAYS for day in days):
+        raise ValueError(spec)
+    return ",".join(day for day in WEEKDAYS if day in days)
+
+def _repeat_days(spec):
+    return set(REPEATS[spec]) if spec in REPEATS else {WEEKDAYS.index(day) for day in spec.split(",")}
+
+class Job:
+    """Alarme (horário do dia, opcionalmente recorrente) ou contagem regressiva nomeada."""
+
+    def __init__(self, name, kind, when, time_of_day=None, repeat=None, duration=0):
+        self.name = name
+        self.kind = kind
+        self.when = when
+        self.time_of_day = time_of_day
+        self.repeat = repeat
+        self.duration = duration
+
+    @classmethod
+    def alarm(cls, name, time_of_day, repeat=None, now=None):
+        job = cls(name, "alarm", None, time_of_day, repeat)
+        job.when = job.next_after(now or datetime.now(), force=True)
+        return job
+
+    @classmethod
+    def countdown(cls, name, seconds, now=None):
+        return cls(name, "countdown", (now or datetime.now()) + timedelta(seconds=seconds), duration=seconds)
+
+    def next_after(self, after, force=False):
+        """Próximo disparo depois de `after`, ou None se o job não se repete."""
+        if self.kind != "alarm" or not (self.repeat or force):
+            return None
+        h, m = map(int, self.time_of_day.split(":"))
+        candidate = after.replace(hour=h, minute=m, second=0, microsecond=0)
+        if candidate <= after:
+            candidate += timedelta(days=1)
+        if self.repeat:
+            days = _repeat_days(self.repeat)
+            while candidate.weekday() not in days:
+                candidate += timedelta(days=1)
+        return candidate
+
+    def describe(self, now):
+        if self.kind == "countdown":
+            remaining = max(int((self.when - now).total_seconds()), 0)
             m, s = divmod(remaining, 60)
-            h2, m = divmod(m, 60)
-            numeric_timestr = f"{h2:02d}{colon}{m:02d}{colon}{s:02d}"
-        elif state["mode"] == "pomodoro":
-            if state["pomodoro_end"]:
-                remaining = int((state["pomodoro_end"] - now).total_seconds())
-                if remaining <= 0:
-                    remaining = 0
-                    if state["pomodoro_phase"] == "work":
-                        state["pomodoro_phase"] = "break"
-                        state["pomodoro_end"] = now + timedelta(seconds=state["pomodoro_break"])
-                        state["pomodoro_cycles"] += 1
-                        msg = "Break time!"
-                    else:
-                        state["pomodoro_phase"] = "work"
-                        state["pomodoro_end"] = now + timedelta(seconds=state["pomodoro_work"])
-                        msg = "Work time!"
-                    curses.beep()
-                    # Recalculate for immediate update
-                    remaining = int((state["pomodoro_end"] - now).total_seconds())
+            h, m = divmod(m, 60)
+            return f"{self.name} {h:02d}:{m:02d}:{s:02d}"
+        return f"{self.name} {self.when.strftime('%a %H:%M')}" + (f" ({self.repeat})" if self.repeat else "")
+
+    def to_dict(self):
+        data = {"name": self.name, "kind": self.kind, "when": self.when.isoformat()}
+        if self.kind == "alarm":
+            data.update(time=self.time_of_day, repeat=self.repeat)
+        else:
+            data["duration"] = self.duration
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["name"], data["kind"], datetime.fromisoformat(data["when"]),
+                   data.get("time"), data.get("repeat"), data.get("duration", 0))
+
+
+class Scheduler:
+    """Fila de prioridade (heap) com todos os prazos de alarmes e contagens regressivas.
+
+    Remoções e reagendamentos deixam entradas obsoletas no heap, descartadas
+    quando chegam ao topo, então adicionar, remover e disparar custam O(log n).
+    """
+
+    def __init__(self, jobs=()):
+        self.jobs = {}
+        self._heap = []
+        self._seq = itertools.count()
+        for job in jobs:
+            self.add(job)
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def add(self, job):
+        self.jobs[job.name] = job
+        heapq.heappush(self._heap, (job.when, next(self._seq), job))
+        if len(self._heap) > 2 * len(self.jobs) + 16:
+            # Muitas entradas obsoletas (substituições/remoções): reconstrói o heap
+            self._heap = [entry for entry in self._heap if self._is_live(entry)]
+            heapq.heapify(self._heap)
+
+    def remove(self, name, kind=None):
+        """Remove o job `name`; com `kind`, só se ele for desse tipo."""
+        job = self.jobs.get(name)
+        if job is None or (kind and job.kind != kind):
+            return None
+        return self.jobs.pop(name)
+
+    def conflict(self, name, kind):
+        """Tipo do job de outro tipo que já usa `name` (os nomes são únicos na agenda), ou None."""
+        job = self.jobs.get(name)
+        return job.kind if job and job.kind != kind else None
+
+    def _is_live(self, entry):
+        when, _, job = entry
+        return self.jobs.get(job.name) is job and job.when == when
+
+    def next_job(self):
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][2] if self._heap else None
+
+    def next_deadline(self):
+        job = self.next_job()
+        return job.when if job else None
+
+    def pop_due(self, now):
+        """Remove e retorna [(job, horário previsto)] vencidos; recorrentes são reagendados."""
+        fired = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if not self._is_live(entry):
+                continue
+            when, _, job = entry
+            fired.append((job, when))
+            # Recorrentes pulam para a próxima ocorrência futura (sem rajada após muito tempo fechado)
+            job.when = job.next_after(now)
+            if job.when:
+                heapq.heappush(self._heap, (job.when, next(self._seq), job))
             else:
-                remaining = state["pomodoro_work"] if state["pomodoro_phase"] == "work" else state["pomodoro_break"]
-            m, s = divmod(remaining, 60)
-            h2, m = divmod(m, 60)
-            numeric_timestr = f"{h2:02d}{colon}{m:02d}{colon}{s:02d}"
-            extra_text = f"({state['pomodoro_phase'].title()}, cycle {state['pomodoro_cycles']})"
-
-        # --- Render World Clock (se aplicável) ---
-        if state["mode"] == "worldclock":
-            stdscr.addstr(2, max((w - 20) // 2, 0), "--- World Clocks ---", curses.A_BOLD)
-            if not state["world_clocks"]:
-                stdscr.addstr(4, max((w - 40) // 2, 0), "Nenhum fuso horário adicionado. Use [add tz Zone/Name]")
+                del self.jobs[job.name]
+        return fired
+
+    def of_kind(self, kind):
+        return sorted((job for job in self.jobs.values() if job.kind == kind), key=lambda job: job.when)
+
+    def to_config(self):
+        return [job.to_dict() for job in sorted(self.jobs.values(), key=lambda job: job.name)]
+
+    @classmethod
+    def from_config(cls, items):
+        return cls(Job.from_dict(item) for item in items)
+
+# --- Timezone backend (carregado sob demanda) ---
+_tz_backend = None
+
+def tz_backend():
+    """Importa o backend de fusos na primeira chamada: pytz se instalado, senão zoneinfo."""
+    global _tz_backend
+    if _tz_backend is None:
+        try:
+            import pytz
+            _tz_backend = ("pytz", pytz.timezone, lambda: pytz.all_timezones)
+        except ImportError:
+            import zoneinfo
+            _tz_backend = ("zoneinfo", zoneinfo.ZoneInfo, zoneinfo.available_timezones)
+    return _tz_backend
+
+def load_timezone(tz_name):
+    """Retorna o tzinfo do fuso, ou None se o nome não existir."""
+    try:
+        return tz_backend()[1](tz_name)
+    except (KeyError, ValueError):  # UnknownTimeZoneError e ZoneInfoNotFoundError herdam de KeyError
+        return None
+
+def available_timezones():
+    return sorted(tz_backend()[2]())
+
+# --- Timezone search index ---
+TZ_INDEX_FILE = os.path.expanduser("~/.py_clock_tzindex.json")
+TZ_INDEX_VERSION = 1
+TZ_SUGGESTIONS = 5
+# Apelidos e abreviações que não são nomes IANA (as abreviações apontam para o fuso com horário de verão)
+TZ_ALIASES = {
+    "sp": "America/Sao_Paulo", "sampa": "America/Sao_Paulo", "rio": "America/Sao_Paulo", "brt": "America/Sao_Paulo",
+    "bsb": "America/Sao_Paulo", "poa": "America/Sao_Paulo", "bh": "America/Sao_Paulo",
+    "nyc": "America/New_York", "ny": "America/New_York", "edt": "America/New_York", "boston": "America/New_York",
+    "la": "America/Los_Angeles", "sf": "America/Los_Angeles", "pst": "America/Los_Angeles",
+    "pdt": "America/Los_Angeles", "seattle": "America/Los_Angeles", "cdt": "America/Chicago",
+    "mdt": "America/Denver", "mst": "America/Denver", "cst": "America/Chicago", "est": "America/New_York",
+    "bst": "Europe/London", "uk": "Europe/London", "ldn": "Europe/London", "cest": "Europe/Paris",
+    "msk": "Europe/Moscow", "ist": "Asia/Kolkata", "mumbai": "Asia/Kolkata", "delhi": "Asia/Kolkata",
+    "bangalore": "Asia/Kolkata", "jst": "Asia/Tokyo", "kst": "Asia/Seoul", "hkt": "Asia/Hong_Kong",
+    "hk": "Asia/Hong_Kong", "sgt": "Asia/Singapore", "beijing": "Asia/Shanghai", "aest": "Australia/Sydney",
+    "aedt": "Australia/Sydney", "nzst": "Pacific/Auckland", "nzdt": "Pacific/Auckland", "art": "America/Argentina/Buenos_Aires",
+    "bue": "America/Argentina/Buenos_Aires", "cdmx": "America/Mexico_City",
+}
+
+def _tz_key(text):
+    """Forma de busca: minúsculas e espaços/hífens como o "_" dos nomes IANA."""
+    return text.strip().lower().replace(" ", "_").replace("-", "_")
+
+def _trigrams(key):
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TzIndex:
+    """Índice de busca sobre os fusos conhecidos: nome completo, cidade e apelidos.
+
+    As chaves ficam ordenadas para busca por prefixo com bisect, e um índice
+    invertido de trigramas responde às buscas aproximadas (erros de digitação).
+    """
+
+    def __init__(self, zones, keys, targets, postings=None, gram_counts=None):
+        self.zones = zones
+        self.zone_set = frozenset(zones)
+        self.keys = keys  # Chaves ordenadas (_tz_key), com repetição quando várias zonas dividem a chave
+        self.targets = targets  # Fuso de cada chave
+        if postings is None:
+            postings, gram_counts = {}, []
+            for i, key in enumerate(keys):
+                grams = _trigrams(key)
+                gram_counts.append(len(grams))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(i)
+        self.postings = postings  # Trigrama -> índices das chaves que o contêm
+        self.gram_counts = gram_counts
+
+    @classmethod
+    def build(cls, zones):
+        entries = set()
+        for zone in zones:
+            key = _tz_key(zone)
+            entries.add((key, zone))
+            if "/" in zone:
+                entries.add((key.rsplit("/", 1)[1], zone))  # Cidade
+        zone_set = set(zones)
+        entries.update((alias, zone) for alias, zone in TZ_ALIASES.items() if zone in zone_set)
+        # Na mesma chave, o nome mais curto vem primeiro (America/Indianapolis antes de America/Indiana/...)
+        entries = sorted(entries, key=lambda entry: (entry[0], len(entry[1]), entry[1]))
+        return cls(sorted(zones), [key for key, _ in entries], [zone for _, zone in entries])
+
+    def prefix(self, text, limit=None):
+        """Fusos cujo nome, cidade ou apelido começa com `text`, sem repetição."""
+        key = _tz_key(text)
+        found = {}
+        for i in range(bisect.bisect_left(self.keys, key), len(self.keys)):
+            if not self.keys[i].startswith(key) or (limit and len(found) >= limit):
+                break
+            found.setdefault(self.targets[i], None)
+        return list(found)
+
+    def fuzzy(self, text, limit=TZ_SUGGESTIONS, threshold=0.2):
+        """Fusos mais parecidos com `text` pelos trigramas em comum (Jaccard), do mais para o menos parecido."""
+        grams = _trigrams(_tz_key(text))
+        shared = {}
+        for gram in grams:
+            for i in self.postings.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        scored = sorted(((count / (len(grams) + self.gram_counts[i] - count), i) for i, count in shared.items()),
+                        reverse=True)
+        found = {}
+        for score, i in scored:
+            if score < threshold or len(found) >= limit:
+                break
+            found.setdefault(self.targets[i], None)
+        return list(found)
+
+    def resolve(self, text):
+        """Nome IANA para `text`: exato, apelido, cidade ou nome sem diferenciar maiúsculas, ou prefixo único."""
+        if text in self.zone_set:
+            return text
+        key = _tz_key(text)
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.targets[i]
+        matches = self.prefix(text, limit=2)
+        return matches[0] if len(matches) == 1 else None
+
+    def search(self, text, limit=TZ_SUGGESTIONS):
+        """Prefixos primeiro, completados pelos resultados aproximados."""
+        found = dict.fromkeys(self.prefix(text, limit))
+        if len(found) < limit:
+            found.update(dict.fromkeys(self.fuzzy(text, limit)))
+        return list(found)[:limit]
+
+    def to_json(self, source):
+        return json.dumps({"version": TZ_INDEX_VERSION, "source": source, "zones": self.zones,
+                           "keys": self.keys, "targets": self.targets, "postings": self.postings,
+                           "gram_counts": self.gram_counts}, separators=(",", ":"))
+
+def _tz_source():
+    """Identifica os dados de fusos sem carregá-los, para validar o cache do índice."""
+    import importlib.util
+    spec = importlib.util.find_spec("pytz")
+    if spec and spec.origin:
+        return f"pytz {spec.origin} {os.stat(spec.origin).st_mtime_ns}"
+    import zoneinfo
+    parts = [f"{path}:{os.stat(path).st_mtime_ns}" for path in zoneinfo.TZPATH if os.path.isdir(path)]
+    tzdata = importlib.util.find_spec("tzdata")
+    if tzdata and tzdata.origin:
+        parts.append(f"tzdata:{os.stat(tzdata.origin).st_mtime_ns}")
+    return "zoneinfo " + " ".join(parts)
+
+_tz_index = None
+
+def tz_index():
+    """Índice de fusos, montado no primeiro uso e guardado em TZ_INDEX_FILE entre execuções.
+
+    Com o cache válido, buscar e completar nem importam o backend de fusos.
+    """
+    global _tz_index
+    if _tz_index is None:
+        source = _tz_source()
+        try:
+            with open(TZ_INDEX_FILE, encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached["version"] == TZ_INDEX_VERSION and cached["source"] == source:
+                _tz_index = TzIndex(cached["zones"], cached["keys"], cached["targets"],
+                                    cached["postings"], cached["gram_counts"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        if _tz_index is None:
+            _tz_index = TzIndex.build(available_timezones())
+            try:
+                _write_atomic(TZ_INDEX_FILE, _tz_index.to_json(source))
+            except OSError:
+                pass  # Sem cache: o índice é refeito na próxima execução
+    return _tz_index
+
+# --- World clock engine ---
+EPOCH_DATE = datetime(1970, 1, 1).date()
+WC_SORTS = ("none", "name", "offset")
+
+class ZoneClock:
+    """Fuso com o offset UTC pré-calculado até a próxima transição (horário de verão).
+
+    Entre transições, converter um timestamp é só aritmética inteira.
+    """
+    PROBE_STEP = 7 * 86400
+    PROBE_LIMIT = 400 * 86400
+
+    def __init__(self, name, tz):
+        self.name = name
+        self.tz = tz
+        self.offset = 0
+        self.valid_from = self.valid_until = 0
+        self._day = None
+        self._date_str = ""
+
+    def _offset_at(self, ts):
+        return int(datetime.fromtimestamp(ts, self.tz).utcoffset().total_seconds())
+
+    def _refresh(self, ts):
+        self.offset = offset = self._offset_at(ts)
+        lo, hi = ts, ts + self.PROBE_STEP
+        while hi - ts < self.PROBE_LIMIT and self._offset_at(hi) == offset:
+            lo, hi = hi, hi + self.PROBE_STEP
+        if hi - ts < self.PROBE_LIMIT:
+            # Busca binária até o segundo exato da transição
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if self._offset_at(mid) == offset:
+                    lo = mid
+                else:
+                    hi = mid
+        self.valid_from, self.valid_until = ts, hi
+
+    def utc_offset(self, ts):
+        ts = int(ts)
+        if not self.valid_from <= ts < self.valid_until:
+            self._refresh(ts)
+        return self.offset
+
+    def format(self, ts):
+        """Retorna (HH:MM:SS, AAAA-MM-DD) locais do fuso para o timestamp dado."""
+        day, secs = divmod(int(ts) + self.utc_offset(ts), 86400)
+        if day != self._day:
+            self._day = day
+            self._date_str = (EPOCH_DATE + timedelta(days=day)).isoformat()
+        h, rem = divmod(secs, 3600)
+        m, s = divmod(rem, 60)
+        return f"{h:02d}:{m:02d}:{s:02d}", self._date_str
+
+def format_utc_offset(offset):
+    sign = "+" if offset >= 0 else "-"
+    h, m = divmod(abs(offset) // 60, 60)
+    return f"UTC{sign}{h:02d}:{m:02d}"
+
+def get_zone(state, tz_name):
+    """Retorna o ZoneClock em cache para o fuso, ou None se o nome for inválido."""
+    cache = state.setdefault("tz_cache", {})
+    if tz_name not in cache:
+        tz = load_timezone(tz_name)
+        cache[tz_name] = ZoneClock(tz_name, tz) if tz else None
+    return cache[tz_name]
+
+def world_clock_rows(state, ts):
+    """Ordena (e opcionalmente agrupa por offset) os fusos sem formatar nada.
+
+    Cada linha é (offset ou None, [nomes], ZoneClock ou None).
+    """
+    rows = []
+    for tz_name in state["world_clocks"]:
+        zone = get_zone(state, tz_name)
+        rows.append((zone.utc_offset(ts) if zone else None, [tz_name], zone))
+    sort = state.get("wc_sort", "none")
+    if state.get("wc_group"):
+        # Os grupos juntam linhas vizinhas: agrupando, a ordem é sempre por offset (o nome só desempata)
+        rows.sort(key=lambda row: (row[0] is None, row[0] or 0) + ((row[1][0],) if sort == "name" else ()))
+    elif sort == "name":
+        rows.sort(key=lambda row: row[1][0])
+    elif sort == "offset":
+        rows.sort(key=lambda row: (row[0] is None, row[0] or 0))
+    if state.get("wc_group"):
+        grouped = []
+        for offset, names, zone in rows:
+            if grouped and zone and grouped[-1][2] and grouped[-1][0] == offset:
+                grouped[-1][1].extend(names)
             else:
-                for i, tz_name in enumerate(state["world_clocks"]):
-                    try:
-                        tz = pytz.timezone(tz_name)
-                        tz_time = now.astimezone(tz)
-                        time_str = tz_time.strftime('%H:%M:%S')
-                        date_str = tz_time.strftime('%Y-%m-%d')
-                        display_str = f"{tz_name:<20} {time_str} ({date_str})"
-                        stdscr.addstr(4 + i, max((w - len(display_str)) // 2, 0), display_str)
-                    except pytz.UnknownTimeZoneError:
-                        stdscr.addstr(4 + i, max((w - 30) // 2, 0), f"{tz_name}: Fuso horário inválido", curses.A_REVERSE)
-            # Pula a renderização do relógio grande
-
-        # --- Calculate layout ---
-        num_extra = 0
-        if extra_text: num_extra += 1
-        if state["show_date"]: num_extra += 1
-        if state["show_quote"]: num_extra += 1
-        total_height = 7 + 2 * num_extra  # 7 for time + 1 line + 1 skip per extra
-        top = max((h - total_height) // 2, 0)
-
-        # --- Render big time (exceto para worldclock) ---
-        if state["mode"] != "worldclock":
-            random_mode = state["color"] == "random"
-            lines = render_time_string(numeric_timestr, pair_map.get(state["color"], pair_map["white"]), random_mode)
-            time_width = len(numeric_timestr) * 7
+                grouped.append((offset, list(names), zone))
+        rows = grouped
+    return rows
+
+def format_world_clock_row(row, ts, grouped=False):
+    offset, names, zone = row
+    if zone is None:
+        return f"{names[0]}: Fuso horário inválido"
+    time_str, date_str = zone.format(ts)
+    if grouped:
+        return f"{format_utc_offset(offset)}  {time_str} ({date_str})  {', '.join(names)}"
+    return f"{names[0]:<20} {time_str} ({date_str})"
+
+def scroll_by(state, key, window):
+    """Rola a lista do modo (`window`, de list_window) até no máximo a última janela cheia."""
+    lines, total, visible = window
+    page = max(visible, 1)
+    delta = {curses.KEY_UP: -1, curses.KEY_DOWN: 1, curses.KEY_PPAGE: -page, curses.KEY_NPAGE: page}[key]
+    state[lines] = min(max(state.get(lines, 0) + delta, 0), max(total - visible, 0))
+
+SCROLL_KEYS = (curses.KEY_UP, curses.KEY_DOWN, curses.KEY_PPAGE, curses.KEY_NPAGE)
+BACKSPACE_KEYS = (curses.KEY_BACKSPACE, 127, 8)
+# Bracketed paste: o terminal cerca o texto colado com estas sequências
+PASTE_ON, PASTE_OFF = b"\x1b[?2004h", b"\x1b[?2004l"
+PASTE_START, PASTE_END = tuple(b"\x1b[200~"), tuple(b"\x1b[201~")
+COMMAND_HISTORY = 50  # Comandos lembrados (salvos na configuração)
+
+# --- Frame composition (damage tracking) ---
+class Frame:
+    """Buffer de células (caractere, atributo) com a mesma API de escrita do stdscr."""
+
+    def __init__(self, h, w):
+        self.h, self.w = h, w
+        self.chars = [[SPACE] * w for _ in range(h)]
+        self.attrs = [[0] * w for _ in range(h)]
+
+    def addstr(self, y, x, text, attr=0):
+        # Recorta silenciosamente o que sair da tela, em vez de levantar curses.error
+        if y < 0 or y >= self.h or x >= self.w:
+            return
+        if x < 0:
+            text, x = text[-x:], 0
+        text = text[:self.w - x]
+        end = x + len(text)
+        self.chars[y][x:end] = text
+        self.attrs[y][x:end] = [attr] * len(text)
+
+    def blit(self, other, y, x):
+        """Copia outro frame (um painel) para a posição (y, x)."""
+        for row in range(min(other.h, self.h - y)):
+            end = min(x + other.w, self.w)
+            self.chars[y + row][x:end] = other.chars[row][:end - x]
+            self.attrs[y + row][x:end] = other.attrs[row][:end - x]
+
+    def to_text(self):
+        return "\n".join("".join(row).rstrip() for row in self.chars)
+
+
+class FrameRenderer:
+    """Escreve no stdscr apenas os trechos que mudaram desde o último frame."""
+
+    def __init__(self, stdscr):
+        self.stdscr = stdscr
+        self.prev = None
+        self.bytes_written = 0
+
+    def invalidate(self):
+        """Força um repaint completo no próximo draw (ex.: após resize)."""
+        self.prev = None
+
+    def draw(self, frame, flush=True):
+        """Escreve as diferenças; com `flush=False` só marca a janela (noutrefresh) e o doupdate fica com quem chama."""
+        if self.prev is None or (self.prev.h, self.prev.w) != (frame.h, frame.w):
+            self.stdscr.clear()
+            self.prev = Frame(frame.h, frame.w)
+        written = 0
+        for y in range(frame.h):
+            new_chars, new_attrs = frame.chars[y], frame.attrs[y]
+            old_chars, old_attrs = self.prev.chars[y], self.prev.attrs[y]
+            if new_chars == old_chars and new_attrs == old_attrs:
+                continue
+            for x, text, attr in _changed_spans(old_chars, old_attrs, new_chars, new_attrs):
+                try:
+                    self.stdscr.addstr(y, x, text, attr)
+                except curses.error:
+                    pass  # Última célula da tela: o curses escreve mas reporta erro
+                written += len(text.encode("utf-8"))
+        self.prev = frame
+        self.bytes_written += written
+        if flush:
+            self.stdscr.refresh()
+        elif written:
+            self.stdscr.noutrefresh()
+        return written
+
+
+def _changed_spans(old_chars, old_attrs, new_chars, new_attrs):
+    """Gera (x, texto, atributo) para cada sequência de células alteradas com o mesmo atributo."""
+    # Máscara e buscas feitas em C (map/list.index): o custo cresce com o número de trechos, não de células
+    changed = list(map(operator.ne, new_chars, old_chars))
+    if new_attrs != old_attrs:
+        changed = list(map(operator.or_, changed, map(operator.ne, new_attrs, old_attrs)))
+    w, x = len(changed), 0
+    while True:
+        try:
+            start = changed.index(True, x)
+        except ValueError:
+            return
+        try:
+            x = changed.index(False, start)
+        except ValueError:
+            x = w
+        attrs = new_attrs[start:x]
+        if attrs.count(attrs[0]) == len(attrs):
+            yield start, "".join(new_chars[start:x]), attrs[0]
+            continue
+        while start < x:
+            attr, end = new_attrs[start], start + 1
+            while end < x and new_attrs[end] == attr:
+                end += 1
+            yield start, "".join(new_chars[start:end]), attr
+            start = end
+
+# --- Scheduling (deadline-driven wakeups) ---
+FLASH_INTERVAL = 0.1  # Piscar do timer terminado (A_REVERSE a 10 Hz)
+
+def low_power_active(state):
+    """Modo de baixo consumo: só vale no relógio em modo zen."""
+    return state.get("low_power", False) and state["minimal_mode"] and state["mode"] == "clock"
+
+def _next_tick(now, end):
+    """Próximo instante em que int((end - now).total_seconds()) muda."""
+    delta = (end - now).total_seconds()
+    frac = delta - int(delta)
+    return now + timedelta(seconds=frac if frac > 0 else 1)
+
+def next_deadline(state, now):
+    """Calcula o próximo instante em que algo visível na tela pode mudar."""
+    next_second = now.replace(microsecond=0) + timedelta(seconds=1)
+    deadlines = [now.replace(second=0, microsecond=0) + timedelta(minutes=1)]
+    mode = state["mode"]
+    if not low_power_active(state):
+        if mode == "worldclock" or state["show_quote"] or state["blink_colon"] or state["color"] == "random":
+            deadlines.append(next_second)
+        if mode == "clock" and state["show_seconds"]:
+            deadlines.append(next_second)
+    if mode == "stopwatch" and state["stopwatch_start"] is not None:
+        deadlines.append(now + timedelta(seconds=STOPWATCH_REFRESH))
+    if mode == "timer" and state["timer_end"] and not state["timer_paused"]:
+        if state["timer_end"] <= now:
+            deadlines.append(now + timedelta(seconds=FLASH_INTERVAL))
+        else:
+            deadlines.append(_next_tick(now, state["timer_end"]))
+    if mode == "pomodoro" and state["pomodoro_end"]:
+        deadlines.append(_next_tick(now, state["pomodoro_end"]))
+    if not state["minimal_mode"] and any(job.kind == "countdown" for job in state["scheduler"].jobs.values()):
+        deadlines.append(next_second)  # Contagens regressivas visíveis na barra de status
+    job_deadline = state["scheduler"].next_deadline()
+    if job_deadline:
+        deadlines.append(max(job_deadline, now))
+    return min(deadlines)
+
+# --- Session history (append-only log) ---
+HISTORY_FILE = os.path.expanduser("~/.py_clock_history.log")
+HISTORY_INDEX = os.path.expanduser("~/.py_clock_history.idx.json")
+HISTORY_MAX_BYTES = 1 << 20  # Tamanho do log antes da rotação
+HISTORY_KEEP = 3  # Logs rotacionados mantidos (.1 é o mais recente)
+STATS_PERIODS = ("today", "week", "month")
+# Alarmes e contagens vêm da agenda compartilhada: cada instância aberta registra o mesmo disparo
+SHARED_EVENTS = ("alarm", "countdown")
+DEDUPE_WINDOW = 86400  # segundos de disparos compartilhados lembrados no índice para descartar repetições
+
+class HistoryLog:
+    """Eventos concluídos (pomodoros, timers, alarmes, sessões de cronômetro) num log só de acréscimo.
+
+    Cada evento é uma linha `epoch<TAB>tipo<TAB>segundos<TAB>nome`. A gravação e a
+    rotação ficam numa thread própria, então `record` nunca bloqueia o loop; a
+    thread só é criada no primeiro evento.
+    """
+
+    def __init__(self, path=None, max_bytes=HISTORY_MAX_BYTES, keep=HISTORY_KEEP):
+        self.path = path or HISTORY_FILE
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.queue = None
+        self.thread = None
+
+    def record(self, kind, when, seconds=0, name=""):
+        if self.thread is None:
+            import queue
+            import threading  # Sob demanda: a maioria das sessões não conclui nada nos primeiros frames
+            self.queue = queue.SimpleQueue()
+            self.thread = threading.Thread(target=self._run, name="history", daemon=True)
+            self.thread.start()
+        self.queue.put(f"{int(when.timestamp())}\t{kind}\t{int(seconds)}\t{name.replace(chr(9), ' ')}\n")
+
+    def close(self):
+        """Grava o que falta na fila e encerra a thread."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def _run(self):
+        while True:
+            lines = [self.queue.get()]
+            while not self.queue.empty():
+                lines.append(self.queue.get())  # Uma escrita para a rajada inteira
+            if any(lines):
+                self._append("".join(line for line in lines if line))
+            if None in lines:
+                return
+
+    def _append(self, text):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(text)
+                size = f.tell()
+            if size >= self.max_bytes:
+                for i in range(self.keep - 1, 0, -1):
+                    if os.path.exists(f"{self.path}.{i}"):
+                        os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+                os.replace(self.path, f"{self.path}.1")
+        except OSError:
+            pass  # O histórico é um extra: um disco cheio não pode derrubar o relógio
+
+def log_event(state, kind, when, seconds=0, name=""):
+    history = state.get("history")
+    if history is not None:
+        history.record(kind, when, seconds, name)
+
+def _fold_log(path, offset, days, seen):
+    """Agrega as linhas completas de `path` a partir de `offset` em `days`; retorna o novo offset.
+
+    Disparos da agenda já vistos (mesmo horário previsto, tipo e nome em `seen`) contam uma vez só.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # Linha ainda sendo escrita: fica para a próxima leitura
+            offset += len(raw)
+            try:
+                ts, kind, seconds, name = raw.decode("utf-8").split("\t", 3)
+                if kind in SHARED_EVENTS:
+                    key = (int(ts), kind, name.rstrip("\n"))
+                    if key in seen:
+                        continue  # O mesmo disparo, registrado por outra instância
+                    seen.add(key)
+                day = days.setdefault(datetime.fromtimestamp(int(ts)).date().isoformat(), {})
+                totals = day.setdefault(kind, [0, 0])
+                totals[0] += 1
+                totals[1] += int(seconds)
+            except (UnicodeDecodeError, ValueError, OverflowError, OSError):
+                continue  # Linha corrompida: ignora só ela
+    return offset
+
+def history_days(path=None, index_path=None):
+    """Totais por dia ({"AAAA-MM-DD": {tipo: [contagem, segundos]}}), atualizando o índice.
+
+    O índice guarda os agregados e até onde (inode e offset) o log já foi lido, então
+    cada consulta só percorre os eventos novos. Logs rotacionados desde a última
+    leitura são reconhecidos pelo inode e terminados antes do log atual. Os disparos
+    da agenda das últimas 24 h também ficam no índice, para descartar os repetidos
+    por outras instâncias mesmo quando chegam numa leitura seguinte.
+    """
+    path = path or HISTORY_FILE
+    index_path = index_path or HISTORY_INDEX
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        days, inode, offset = index["days"], index["inode"], index["offset"]
+        seen = {tuple(key) for key in index.get("seen", ())}
+    except (OSError, ValueError, KeyError, TypeError):
+        days, inode, offset, seen = {}, None, 0, set()
+    files = []
+    for name in [f"{path}.{i}" for i in range(HISTORY_KEEP, 0, -1)] + [path]:
+        try:
+            files.append((name, os.stat(name).st_ino))
+        except OSError:
+            pass
+    inodes = [ino for _, ino in files]
+    start = inodes.index(inode) if inode in inodes else 0  # Sem o inode conhecido, todos são novos
+    changed = False
+    for i, (name, ino) in enumerate(files[start:], start):
+        begin = offset if ino == inode else 0
+        try:
+            end = _fold_log(name, begin, days, seen)
+        except OSError:
+            continue
+        changed = changed or end != begin or ino != inode
+        inode, offset = ino, end
+    if changed:
+        newest = max((key[0] for key in seen), default=0)
+        seen = sorted(key for key in seen if key[0] > newest - DEDUPE_WINDOW)
+        index = {"inode": inode, "offset": offset, "days": days, "seen": seen}
+        try:
+            _write_atomic(index_path, json.dumps(index, separators=(",", ":")))
+        except OSError:
+            pass
+    return days
+
+def _short_duration(seconds):
+    if seconds < 60:
+        return f"{seconds}s"
+    h, m = divmod(seconds // 60, 60)
+    return f"{h}h{m:02d}m" if h else f"{m}m"
+
+def _streaks(days, today):
+    """(sequência atual, maior sequência) de dias com pelo menos um pomodoro concluído."""
+    focus_days = sorted(date.fromisoformat(day) for day, totals in days.items() if totals.get("pomodoro"))
+    best = run = 0
+    previous = None
+    for day in focus_days:
+        run = run + 1 if previous and (day - previous).days == 1 else 1
+        best = max(best, run)
+        previous = day
+    # A sequência continua viva até o fim do dia seguinte ao último pomodoro
+    current = run if previous and (today - previous).days <= 1 else 0
+    return current, best
+
+def history_stats(period, today, days):
+    """Resumo de uma linha do período (today, week ou month) terminado em `today`."""
+    if period == "week":
+        start = today - timedelta(days=today.weekday())
+    elif period == "month":
+        start = today.replace(day=1)
+    else:
+        start = today
+    totals = {}
+    first, last = start.isoformat(), today.isoformat()
+    for day, kinds in days.items():
+        if first <= day <= last:
+            for kind, (count, seconds) in kinds.items():
+                total = totals.setdefault(kind, [0, 0])
+                total[0] += count
+                total[1] += seconds
+    parts = []
+    count, seconds = totals.get("pomodoro", (0, 0))
+    parts.append(f"{count} pomodoro{'s' * (count != 1)}, {_short_duration(seconds)} focus")
+    for kind, label in (("timer", "timer"), ("countdown", "countdown"), ("alarm", "alarm")):
+        count = totals.get(kind, (0, 0))[0]
+        if count:
+            parts.append(f"{count} {label}{'s' * (count != 1)}")
+    count, seconds = totals.get("stopwatch", (0, 0))
+    if count:
+        parts.append(f"{count} stopwatch session{'s' * (count != 1)} ({_short_duration(seconds)})")
+    current, best = _streaks(days, today)
+    parts.append(f"streak {current}d (best {best}d)")
+    return f"{period.capitalize()}: " + " | ".join(parts)
+
+# --- State, ticking and layout (independentes do curses) ---
+MODES = ("clock", "stopwatch", "timer", "pomodoro", "worldclock")
+HELP_BAR = "[c]color [s]secs [h]12h [d]date [b]blink [q]quote [o]zen [w]stopwatch [t]timer [p]pomodoro [a]clock [z]world [m]hud [tab]pane [?]help [q]quit"
+pair_map = {}
+
+def set_color_pairs(pairs):
+    """Registra os atributos de cor (nome -> attr) usados pelo layout."""
+    global pair_map, palette
+    pair_map = dict(pairs)
+    palette = tuple(pair_map.values())
+    render_time_string.cache_clear()
+
+def headless_color_pairs():
+    """Atributos de cor sem curses inicializado, no mesmo layout do COLOR_PAIR do ncurses."""
+    return {name: idx << 8 for idx, name in enumerate(COLOR_MAP.keys(), start=1)}
+
+def default_state():
+    return {
+        "mode": "clock", "show_seconds": True, "h12": False, "color": "cyan", "show_date": False,
+        **_mode_state(),
+        "scheduler": Scheduler(),
+        "pomodoro_work": 25 * 60, "pomodoro_break": 5 * 60,
+        "show_quote": False, "blink_colon": True,
+        "world_clocks": [], "minimal_mode": False, "low_power": False,
+        "wc_sort": "none", "wc_group": False,
+        "hud": False, "metrics": Metrics(), "history": None, "command_history": [],
+        "layout": [], "panes": [], "focus": 0,
+    }
+
+def tick(state, now, beep=lambda: None, fire_jobs=True):
+    """Avança alarme, timer e pomodoro até `now`. Retorna a mensagem a exibir, se houver.
+
+    Com `fire_jobs=False` a agenda fica por conta de quem chama (a tarefa de alarmes do loop asyncio).
+    """
+    msg = None
+    if state["mode"] == "timer" and state["timer_end"] and (state["timer_end"] - now).total_seconds() <= 0:
+        if not state["last_beep"] or (now - state["last_beep"]).total_seconds() > 1:
+            if not state["last_beep"] or state["last_beep"] < state["timer_end"]:
+                log_event(state, "timer", now, state["timer_duration"])  # Primeiro bipe deste timer
+            beep()
+            state["last_beep"] = now
+    if fire_jobs:
+        msg = fire_due_jobs(state, now, beep)
+    if state["mode"] == "pomodoro" and state["pomodoro_end"] and int((state["pomodoro_end"] - now).total_seconds()) <= 0:
+        if state["pomodoro_phase"] == "work":
+            state["pomodoro_phase"] = "break"
+            state["pomodoro_end"] = now + timedelta(seconds=state["pomodoro_break"])
+            state["pomodoro_cycles"] += 1
+            log_event(state, "pomodoro", now, state["pomodoro_work"])
+            msg = "Break time!"
+        else:
+            state["pomodoro_phase"] = "work"
+            state["pomodoro_end"] = now + timedelta(seconds=state["pomodoro_work"])
+            msg = "Work time!"
+        beep()
+    return msg
+
+def fire_due_jobs(state, now, beep=lambda: None):
+    """Dispara alarmes e contagens vencidos até `now`; retorna a mensagem, se houver."""
+    fired = []
+    for job, when in state["scheduler"].pop_due(now):
+        label = job.kind if job.name == "alarm" else f"{job.kind} {job.name}"
+        if (now - when).total_seconds() > MISSED_GRACE:
+            # Venceu com o relógio fechado (ou suspenso)
+            fired.append(f"Missed {label} ({when.strftime('%Y-%m-%d %H:%M')})")
+        elif job.kind == "countdown":
+            fired.append(f"Countdown {job.name} finished!")
+            log_event(state, "countdown", when, job.duration, job.name)  # Horário previsto: igual em todas as instâncias
+        else:
+            fired.append("Alarm triggered!" if job.name == "alarm" else f"Alarm {job.name}!")
+            log_event(state, "alarm", when, 0, job.name)
+    if not fired:
+        return None
+    beep()
+    return "; ".join(fired)
+
+def state_snapshot(state, now, mono_ns=None):
+    """Retrato do estado em JSON puro: a configuração persistente mais o que está rodando agora."""
+    if state["timer_end"] and not state["timer_paused"]:
+        timer_remaining = max(int((state["timer_end"] - now).total_seconds()), 0)
+    elif state["timer_paused"]:
+        timer_remaining = state["timer_remaining"]
+    else:
+        timer_remaining = state["timer_duration"]
+    pomodoro_remaining = max(int((state["pomodoro_end"] - now).total_seconds()), 0) if state["pomodoro_end"] else None
+    elapsed_ns = stopwatch_elapsed_ns(state, mono_ns)
+    return {
+        "time": now.isoformat(timespec="seconds"),
+        "mode": state["mode"],
+        "stopwatch": {"running": state["stopwatch_start"] is not None, "elapsed_ns": elapsed_ns,
+                      "elapsed": format_ns(elapsed_ns), "laps": len(state["laps"])},
+        "timer": {"running": bool(state["timer_end"]) and not state["timer_paused"],
+                  "paused": state["timer_paused"], "remaining": timer_remaining},
+        "pomodoro": {"phase": state["pomodoro_phase"], "remaining": pomodoro_remaining,
+                     "cycles": state["pomodoro_cycles"]},
+        "status": schedule_status(state["scheduler"], now),
+        "config": config_snapshot(state),
+    }
+
+STATUS_HEARTBEAT = clockstatus.STALE_AFTER / 2  # Publicação mínima, para o leitor não marcar o status como velho
+
+def status_fields(state, now, msg=""):
+    """Campos do arquivo de status (clockstatus): instantes em epoch, para o leitor calcular os restantes."""
+    ts = now.timestamp()
+    timer_running = bool(state["timer_end"]) and not state["timer_paused"]
+    if state["pomodoro_end"]:
+        pomodoro_remaining = max(int((state["pomodoro_end"] - now).total_seconds()), 0)
+    else:
+        pomodoro_remaining = state["pomodoro_work"] if state["pomodoro_phase"] == "work" else state["pomodoro_break"]
+    job = state["scheduler"].next_job()
+    zones = []
+    for name in state["world_clocks"][:clockstatus.MAX_ZONES]:
+        zone = get_zone(state, name)
+        if zone:
+            zones.append((name, zone.utc_offset(ts), zone.valid_until))
+    status = {
+        "updated": ts, "mode": state["mode"], "msg": msg or "",
+        "timer_running": timer_running, "timer_paused": state["timer_paused"],
+        "timer_end": state["timer_end"].timestamp() if timer_running else 0.0,
+        "timer_remaining": state["timer_remaining"] if state["timer_paused"] else state["timer_duration"],
+        "pomodoro_phase": state["pomodoro_phase"], "pomodoro_cycles": state["pomodoro_cycles"],
+        "pomodoro_end": state["pomodoro_end"].timestamp() if state["pomodoro_end"] else 0.0,
+        "pomodoro_remaining": pomodoro_remaining,
+        "stopwatch_running": state["stopwatch_start"] is not None,
+        "stopwatch_elapsed": stopwatch_elapsed_ns(state) / 1e9,
+        "alarm_kind": job.kind if job else "", "alarm_name": job.name if job else "",
+        "alarm_at": job.when.timestamp() if job else 0.0,
+    }
+    return status, zones
+
+def schedule_status(scheduler, now):
+    """Linha de status com o próximo alarme e as contagens regressivas ativas."""
+    parts = []
+    alarms = scheduler.of_kind("alarm")
+    if alarms:
+        parts.append(f"Alarm set for {alarms[0].when.strftime('%H:%M')}"
+                     + (f" (+{len(alarms) - 1} more)" if len(alarms) > 1 else ""))
+    countdowns = scheduler.of_kind("countdown")
+    if countdowns:
+        parts.append("Countdowns: " + ", ".join(job.describe(now) for job in countdowns))
+    return " | ".join(parts)
+
+def _stopwatch_text(state, colon=":", mono_ns=None):
+    # Relógio monotônico: imune a ajustes de NTP e mudanças de horário de verão
+    s, ms = divmod(stopwatch_elapsed_ns(state, mono_ns) // 1_000_000, 1000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    text = f"{m:02d}{colon}{s:02d}.{ms:03d}"
+    return f"{h:02d}{colon}" + text if h else text
+
+def _time_layout(h, usable, w, text_len, num_extra, reserve):
+    """(tamanho da fonte, altura dos glifos, linha do topo) do horário grande."""
+    size = pick_font_size(usable - 2 * num_extra - reserve, w - 2, text_len)
+    glyph_height = font_metrics(size)[0] if size else 1
+    total_height = glyph_height + 2 * num_extra  # glyph rows + 1 line + 1 skip per extra
+    return size, glyph_height, max(min((h - total_height) // 2, usable - reserve - total_height), 0)
+
+def list_window(state, now, h, w, chrome=True):
+    """(chave do deslocamento, total de linhas, linhas visíveis) da lista rolável do modo, ou None.
+
+    Faz as mesmas contas do compose_frame, para o teclado limitar a rolagem sem montar o frame.
+    """
+    usable = h - 5 if chrome and not state["minimal_mode"] else h
+    if state["mode"] == "worldclock":
+        return "wc_scroll", len(world_clock_rows(state, now.timestamp())), max(usable - 4, 1)
+    if state["mode"] == "stopwatch":
+        num_extra = state["show_date"] + state["show_quote"]
+        reserve = LAP_RESERVE if state["laps"] else 0
+        _, glyph_height, top = _time_layout(h, usable, w, len(_stopwatch_text(state)), num_extra, reserve)
+        return "lap_scroll", len(state["laps"]), max(usable - (top + glyph_height + 2 * num_extra + 2), 0)
+    return None
+
+def compose_frame(state, now, h, w, msg="", input_buffer="", mono_ns=None, chrome=True):
+    """Monta o frame completo da tela para o estado e instante dados, sem tocar no terminal.
+
+    `mono_ns` é o instante do relógio monotônico usado pelo cronômetro (padrão: agora).
+    Com `chrome=False` (painéis) a barra de status e o prompt ficam de fora.
+    """
+    frame = Frame(h, w)
+    chrome = chrome and not state["minimal_mode"]
+    usable = h - 5 if chrome else h  # Acima da barra de status
+    low_power = low_power_active(state)
+    blink = (now.second % 2 == 0) and not low_power
+    finished_blink = False
+    remaining = None
+
+    # --- Build numeric time string ---
+    colon = " " if (state["blink_colon"] and blink) else ":"
+    numeric_timestr = ""
+    extra_text = ""
+    if state["mode"] == "clock":
+        hour = now.hour
+        if state["h12"]:
+            ampm = "AM" if hour < 12 else "PM"
+            hour = hour % 12 or 12
+            extra_text = ampm
+        numeric_timestr = f"{hour:02d}{colon}{now.minute:02d}"
+        if state["show_seconds"] and not low_power:
+            numeric_timestr += f"{colon}{now.second:02d}"
+    elif state["mode"] == "stopwatch":
+        numeric_timestr = _stopwatch_text(state, colon, mono_ns)
+    elif state["mode"] == "timer":
+        if state["timer_end"] and not state["timer_paused"]:
+            remaining = int((state["timer_end"] - now).total_seconds())
+            if remaining <= 0:
+                remaining = 0
+                finished_blink = True
+        elif state["timer_paused"]:
+            remaining = state["timer_remaining"]
+        else:
+            remaining = state["timer_duration"]
+        m, s = divmod(remaining, 60)
+        h2, m = divmod(m, 60)
+        numeric_timestr = f"{h2:02d}{colon}{m:02d}{colon}{s:02d}"
+    elif state["mode"] == "pomodoro":
+        if state["pomodoro_end"]:
+            remaining = max(int((state["pomodoro_end"] - now).total_seconds()), 0)
+        else:
+            remaining = state["pomodoro_work"] if state["pomodoro_phase"] == "work" else state["pomodoro_break"]
+        m, s = divmod(remaining, 60)
+        h2, m = divmod(m, 60)
+        numeric_timestr = f"{h2:02d}{colon}{m:02d}{colon}{s:02d}"
+        extra_text = f"({state['pomodoro_phase'].title()}, cycle {state['pomodoro_cycles']})"
+
+    # --- Render World Clock (se aplicável) ---
+    if state["mode"] == "worldclock":
+        frame.addstr(2, max((w - 20) // 2, 0), "--- World Clocks ---", curses.A_BOLD)
+        if not state["world_clocks"]:
+            frame.addstr(4, max((w - 40) // 2, 0), "Nenhum fuso horário adicionado. Use [add tz Zone/Name]")
+        else:
+            # Lista virtualizada: só as linhas visíveis são formatadas
+            ts = now.timestamp()
+            rows = world_clock_rows(state, ts)
+            visible = max(usable - 4, 1)
+            scroll = min(state.get("wc_scroll", 0), max(len(rows) - visible, 0))  # Já limitado no teclado; aqui só o resize
+            for i, row in enumerate(rows[scroll:scroll + visible]):
+                display_str = format_world_clock_row(row, ts, state.get("wc_group", False))[:w - 2]
+                attr = curses.A_REVERSE if row[2] is None else 0
+                frame.addstr(4 + i, max((w - len(display_str)) // 2, 0), display_str, attr)
+            if len(rows) > visible:
+                pos = f"{scroll + 1}-{min(scroll + visible, len(rows))} / {len(rows)}"
+                frame.addstr(3, max((w - len(pos)) // 2, 0), pos, curses.A_DIM)
+        # Pula a renderização do relógio grande
+
+    # --- Calculate layout ---
+    num_extra = 0
+    if extra_text: num_extra += 1
+    if state["show_date"]: num_extra += 1
+    if state["show_quote"]: num_extra += 1
+    reserve = LAP_RESERVE if state["mode"] == "stopwatch" and state["laps"] else 0
+    size, glyph_height, top = _time_layout(h, usable, w, len(numeric_timestr), num_extra, reserve)
+
+    # --- Render big time (exceto para worldclock) ---
+    if state["mode"] != "worldclock":
+        color_pair = pair_map.get(state["color"], pair_map["white"])
+        flash = (finished_blink or (remaining is not None and remaining <= 0)) and (int(now.timestamp() * 10) % 2 == 0)
+        if size:
+            lines = render_time_string(numeric_timestr, color_pair, state["color"] == "random", size)
+            time_width = len(lines[0][1].rstrip()) if lines else 0
             x = max((w - time_width) // 2, 0)
             for i, (c, line) in enumerate(lines):
-                attr = c
-                if (finished_blink or (state["mode"] in ["timer", "pomodoro"] and remaining <= 0)) and (int(now.timestamp() * 10) % 2 == 0):
-                    attr |= curses.A_REVERSE
-                stdscr.addstr(top + i, x, line, attr)
-
-        # --- Render extra elements dynamically ---
-        y = top + 7
-        if extra_text:
-            stdscr.addstr(y + 1, max((w - len(extra_text)) // 2, 0), extra_text, curses.A_DIM)
-            y += 2
-        if state["show_date"]:
-            date_str = now.strftime("%A, %d %B %Y")
-            stdscr.addstr(y + 1, max((w - len(date_str)) // 2, 0), date_str)
-            y += 2
-        if state["show_quote"]:
-            quote_index = now.second % len(QUOTES)
-            quote = QUOTES[quote_index]
-            stdscr.addstr(y + 1, max((w - len(quote)) // 2, 0), quote, curses.A_DIM)
-            y += 2
-
-        # --- Display laps if any (left-aligned below display) ---
-        if state["mode"] == "stopwatch" and state["laps"]:
-            lap_str = "Laps: " + ", ".join(f"{i+1}: {int(t)//60:02d}:{int(t)%60:02d}" for i, t in enumerate(state["laps"]))
-            display_laps = lap_str[:w - 2]
-            stdscr.addstr(y + 1, 1, display_laps, curses.A_DIM)
-
-        # --- Status and input at bottom (unless in minimal mode) ---
-        if not state["minimal_mode"]:
-            help_str = "[c]color [s]secs [h]12h [d]date [b]blink [q]quote [o]zen [w]stopwatch [t]timer [p]pomodoro [a]clock [z]world [?]help [q]quit"
-            stdscr.addstr(h - 5, 1, help_str[:w - 2], curses.A_DIM)
+                frame.addstr(top + i, x, line, c | curses.A_REVERSE if flash else c)
+        else:
+            # Nem a menor fonte cabe: uma linha de texto, como nos fusos do relógio mundial
+            attr = color_pair | curses.A_BOLD
+            frame.addstr(top, max((w - len(numeric_timestr)) // 2, 0), numeric_timestr, attr | curses.A_REVERSE if flash else attr)
+
+    # --- Render extra elements dynamically ---
+    y = top + glyph_height
+    if extra_text:
+        frame.addstr(y + 1, max((w - len(extra_text)) // 2, 0), extra_text, curses.A_DIM)
+        y += 2
+    if state["show_date"]:
+        date_str = now.strftime("%A, %d %B %Y")
+        frame.addstr(y + 1, max((w - len(date_str)) // 2, 0), date_str)
+        y += 2
+    if state["show_quote"]:
+        quote = QUOTES[(now.minute if low_power else now.second) % len(QUOTES)]
+        frame.addstr(y + 1, max((w - len(quote)) // 2, 0), quote, curses.A_DIM)
+        y += 2
+
+    # --- Display laps if any (left-aligned below display) ---
+    if state["mode"] == "stopwatch" and state["laps"]:
+        # Janela rolável, mais recentes primeiro: só as voltas visíveis são formatadas
+        laps = state["laps"]
+        frame.addstr(y + 1, 1, laps.summary()[:w - 2], curses.A_DIM)
+        visible = max(usable - (y + 2), 0)
+        scroll = min(state.get("lap_scroll", 0), max(len(laps) - visible, 0))
+        for row in range(min(visible, len(laps) - scroll)):
+            frame.addstr(y + 2 + row, 1, laps.format_row(len(laps) - 1 - scroll - row)[:w - 2], curses.A_DIM)
+
+    # --- Status and input at bottom (unless in minimal mode) ---
+    if chrome:
+        draw_status(frame, state, now, msg, input_buffer)
+    return frame
+
+def draw_status(frame, state, now, msg="", input_buffer=""):
+    """Barra de status e prompt nas 5 últimas linhas do frame."""
+    h, w = frame.h, frame.w
+    frame.addstr(h - 5, 1, HELP_BAR[:w - 2], curses.A_DIM)
+    if msg:
+        frame.addstr(h - 4, 1, msg[:w - 2], curses.A_BOLD)
+    panes = state["panes"]
+    pane = f"Pane {state['focus'] + 1}/{len(panes)} | " if len(panes) > 1 else ""
+    frame.addstr(h - 3, 1, f"{pane}Mode: {state['mode']} | Color: {state['color']}", curses.A_DIM)
+    status = schedule_status(state["scheduler"], now)
+    if status:
+        frame.addstr(h - 2, 1, status[:w - 2], curses.A_DIM)
+    if len(input_buffer) > w - 4:
+        input_buffer = "…" + input_buffer[-(w - 5):]  # Comando longo (colado): mostra o fim, onde se digita
+    frame.addstr(h - 1, 1, "> " + input_buffer)
+
+# --- Panes (vários modos lado a lado) ---
+MAX_PANES = 9
+PANE_MIN = (3, 12)  # (linhas, colunas) mínimas de um painel, com a linha de título
+
+def _mode_state():
+    """Chaves que cada instância de modo tem só para si (um cronômetro, um timer, um pomodoro...)."""
+    return {
+        "stopwatch_start": None, "stopwatch_elapsed": 0, "laps": Laps(), "lap_scroll": 0,
+        "timer_end": None, "timer_duration": 0, "timer_paused": False, "timer_remaining": 0,
+        "pomodoro_phase": "work", "pomodoro_end": None, "pomodoro_cycles": 0,
+        "wc_scroll": 0, "last_beep": None,
+    }
+
+class PaneState(MutableMapping):
+    """Fatia do estado de um painel: modo e contadores próprios, o resto compartilhado.
+
+    Cor, formato, agenda, fusos e configuração vêm do estado principal, então
+    tick, compose_frame e os comandos funcionam num painel sem saber dele.
+    """
+
+    def __init__(self, shared, mode):
+        self.shared = shared
+        self.local = dict(_mode_state(), mode=mode)
+
+    def __getitem__(self, key):
+        return self.local[key] if key in self.local else self.shared[key]
+
+    def __setitem__(self, key, value):
+        if key in self.local:
+            self.local[key] = value
+        else:
+            self.shared[key] = value
+
+    def __delitem__(self, key):
+        del (self.local if key in self.local else self.shared)[key]
+
+    def __iter__(self):
+        return iter(self.shared)
+
+    def __len__(self):
+        return len(self.shared)
+
+def ensure_panes(state):
+    """Painéis do layout salvo (o primeiro é o próprio estado); refeitos só quando o layout muda.
+
+    Painéis cujo modo não mudou são reaproveitados, com o que estiver rodando neles.
+    """
+    layout = state["layout"]
+    if len(layout) < 2:
+        state["panes"] = []
+        return [state]
+    old = state["panes"]
+    if [pane["mode"] for pane in old] != layout:
+        state["mode"] = layout[0]
+        state["panes"] = [state] + [
+            old[i] if i < len(old) and old[i]["mode"] == mode else PaneState(state, mode)
+            for i, mode in enumerate(layout[1:], 1)
+        ]
+        state["focus"] = min(state["focus"], len(layout) - 1)
+    return state["panes"]
+
+def sync_layout(state):
+    """Leva para o layout (salvo na configuração) o modo atual de cada painel."""
+    panes = state["panes"]
+    if len(panes) > 1:
+        state["layout"] = [pane["mode"] for pane in panes]
+
+def focused_pane(state):
+    panes = state["panes"]
+    return panes[min(state["focus"], len(panes) - 1)] if len(panes) > 1 else state
+
+def tick_panes(state, now, beep=lambda: None, fire_jobs=True):
+    """tick() em todos os painéis; a agenda, compartilhada, só é disparada uma vez."""
+    msg = tick(state, now, beep, fire_jobs)
+    for pane in state["panes"][1:]:
+        msg = tick(pane, now, beep, fire_jobs=False) or msg
+    return msg
+
+def panes_deadline(state, now):
+    return min(next_deadline(pane, now) for pane in ensure_panes(state))
+
+def daemon_deadline(state, now):
+    """Próximo prazo sem tela: só o fim de um timer ou de uma fase do pomodoro (piscar, citação e cores não contam)."""
+    deadlines = [now + timedelta(seconds=ALARM_RECHECK)]
+    for pane in ensure_panes(state):
+        if pane["mode"] == "timer" and pane["timer_end"] and not pane["timer_paused"] and pane["timer_end"] > now:
+            deadlines.append(pane["timer_end"])
+        if pane["mode"] == "pomodoro" and pane["pomodoro_end"] and pane["pomodoro_end"] > now:
+            deadlines.append(pane["pomodoro_end"])
+    return min(deadlines)
+
+def pane_rects(n, h, w):
+    """Divide a área em uma grade de n painéis (y, x, linhas, colunas); [] se não couberem.
+
+    Telas largas ganham mais colunas; a última linha da grade estica os painéis que sobram.
+    """
+    cols = 1
+    while cols * cols < n:
+        cols += 1
+    rows = -(-n // cols)
+    if w < 2 * h:
+        rows, cols = cols, rows  # Tela em pé (uma célula é ~2x mais alta que larga): mais linhas
+    rows = -(-n // cols)
+    if h // rows < PANE_MIN[0] or w // cols < PANE_MIN[1]:
+        return []
+    rects = []
+    for r in range(rows):
+        count = min(cols, n - r * cols)
+        y, ph = r * h // rows, (r + 1) * h // rows - r * h // rows
+        for c in range(count):
+            x = c * w // count
+            rects.append((y, x, ph, (c + 1) * w // count - x))
+    return rects
+
+def compose_pane(pane, now, h, w, index, focused, separator, mono_ns=None):
+    """Frame de um painel: linha de título, o modo sem a barra de status e, se não for o último à direita, um divisor."""
+    sep = 1 if separator else 0
+    frame = Frame(h, w)
+    frame.addstr(0, 0, "─" * (w - sep), curses.A_DIM)
+    frame.addstr(0, 1, f" {index + 1} {pane['mode']} ", curses.A_REVERSE | curses.A_BOLD if focused else curses.A_DIM)
+    frame.blit(compose_frame(pane, now, h - 1, w - sep, mono_ns=mono_ns, chrome=False), 1, 0)
+    if sep:
+        for y in range(h):
+            frame.chars[y][w - 1] = "│"
+            frame.attrs[y][w - 1] = curses.A_DIM
+    return frame
+
+def _pane_slots(state, h, w):
+    """(painel, índice, retângulo) de cada painel visível; se a grade não couber, só o painel em foco."""
+    panes = state["panes"]
+    rects = pane_rects(len(panes), h, w)
+    if rects:
+        return [(pane, i, rect) for i, (pane, rect) in enumerate(zip(panes, rects))]
+    focus = min(state["focus"], len(panes) - 1)
+    return [(panes[focus], focus, (0, 0, h, w))]
+
+def compose_layout(state, now, h, w, msg="", input_buffer="", mono_ns=None):
+    """Como compose_frame, mas com os painéis do layout numa tela só (headless e benchmarks)."""
+    panes = ensure_panes(state)
+    if len(panes) < 2:
+        return compose_frame(state, now, h, w, msg, input_buffer, mono_ns)
+    frame = Frame(h, w)
+    chrome = not state["minimal_mode"]
+    for pane, i, (y, x, ph, pw) in _pane_slots(state, h - 5 if chrome else h, w):
+        frame.blit(compose_pane(pane, now, ph, pw, i, i == state["focus"], x + pw < w, mono_ns), y, x)
+    if chrome:
+        draw_status(frame, focused_pane(state), now, msg, input_buffer)
+    return frame
+
+class Compositor:
+    """Desenha o layout em subjanelas curses, uma por painel, com um único doupdate por frame.
+
+    Cada painel tem o seu FrameRenderer e o seu próximo prazo (next_deadline): um
+    painel cujo conteúdo não pode ter mudado nem é montado, e um que não mudou
+    não chega ao terminal.
+    """
+
+    def __init__(self, stdscr):
+        self.stdscr = stdscr
+        self.key = None
+        self.slots = []  # [painel, índice, retângulo, renderer, prazo]
+        self.bar = None
+
+    def invalidate(self):
+        self.key = None
+
+    def draw(self, state, now, msg="", input_buffer="", force=False, hud=None):
+        h, w = self.stdscr.getmaxyx()
+        chrome = not state["minimal_mode"] and h > 5
+        key = (tuple(map(id, state["panes"])), h, w, chrome)
+        if key != self.key:
+            self.key = key
+            self.stdscr.erase()
+            self.stdscr.noutrefresh()
+            self.slots = [[pane, i, (y, x, ph, pw), FrameRenderer(self.stdscr.derwin(ph, pw, y, x)), None]
+                          for pane, i, (y, x, ph, pw) in _pane_slots(state, h - 5 if chrome else h, w)]
+            self.bar = FrameRenderer(self.stdscr.derwin(5, w, h - 5, 0)) if chrome else None
+            force = True
+        written = 0
+        for slot in self.slots:
+            pane, i, (y, x, ph, pw), renderer, due = slot
+            corner = hud is not None and y == 0 and x + pw == w  # O HUD fica no canto superior direito
+            if not (force or corner or now >= due):
+                continue  # Nada visível mudou neste painel
+            frame = compose_pane(pane, now, ph, pw, i, i == state["focus"], x + pw < w)
+            if corner:
+                draw_hud(frame, hud)
+            written += renderer.draw(frame, flush=False)
+            slot[4] = next_deadline(pane, now)
+        if self.bar:
+            bar = Frame(5, w)
+            draw_status(bar, focused_pane(state), now, msg, input_buffer)
+            written += self.bar.draw(bar, flush=False)
+        curses.doupdate()
+        return written
+
+# --- Startup profile ---
+STARTUP_BUDGET_MS = 250.0
+
+class StartupProfile:
+    """Tempo (ms) de cada fase da inicialização, do primeiro import até o primeiro frame."""
+
+    def __init__(self, budget_ms=STARTUP_BUDGET_MS):
+        self.budget_ms = budget_ms
+        self.phases = [("imports", (_T_IMPORTS - _T0) * 1000), ("definitions", (_T_MODULE - _T_IMPORTS) * 1000)]
+        self.last = _T_MODULE
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    def total_ms(self):
+        return sum(ms for _, ms in self.phases)
+
+    def over_budget(self):
+        return self.total_ms() > self.budget_ms
+
+    def report(self, fmt="text"):
+        total = self.total_ms()
+        if fmt == "json":
+            return json.dumps({"phases": dict(self.phases), "total_ms": total, "budget_ms": self.budget_ms,
+                               "tz_backend": _tz_backend[0] if _tz_backend else None})
+        lines = [f"{phase:<14} {ms:8.1f} ms" for phase, ms in self.phases]
+        lines.append(f"{'total':<14} {total:8.1f} ms (budget {self.budget_ms:.0f} ms{', EXCEDIDO' if total > self.budget_ms else ''})")
+        return "\n".join(lines)
+
+# --- Performance metrics (HUD) ---
+METRICS_FILE = os.path.expanduser("~/.py_clock_metrics.json")
+HIST_BOUNDS = tuple(0.01 * 1.25 ** i for i in range(80))  # Buckets exponenciais de 0.01 a ~5e5
+HUD_WIDTH = 30
+
+class Histogram:
+    """Contagens por bucket exponencial: registrar custa um bisect, sem guardar amostras."""
+
+    def __init__(self, bounds=HIST_BOUNDS):
+        self.bounds = bounds
+        self.counts = array('q', bytes(8 * (len(bounds) + 1)))  # Último bucket: acima do maior limite
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.last = value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """Limite superior do bucket que contém o percentil p (0-100)."""
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count, "mean": self.mean(), "min": self.min or 0.0, "max": self.max or 0.0,
+            "p50": self.percentile(50), "p90": self.percentile(90), "p99": self.percentile(99),
+        }
+
+    def to_dict(self):
+        buckets = {f"{self.bounds[i]:.4g}" if i < len(self.bounds) else "inf": n
+                   for i, n in enumerate(self.counts) if n}
+        return dict(self.summary(), buckets=buckets)
+
+
+class Metrics:
+    """Custos do loop principal: render, getch, bytes por frame, drift do segundo e despertares."""
+
+    FIELDS = ("render_ms", "getch_ms", "bytes", "drift_ms")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.hist = {name: Histogram() for name in self.FIELDS}
+        self.started = time.time()
+        self.wakeups = 0
+        self.wakeups_per_sec = 0.0
+        self.window_start = time.monotonic()
+        self.window_wakeups = 0
+        self.shown_second = None
+
+    def record(self, name, value):
+        self.hist[name].record(value)
+
+    def wakeup(self):
+        self.wakeups += 1
+        self.window_wakeups += 1
+        mono = time.monotonic()
+        if mono - self.window_start >= 1.0:
+            self.wakeups_per_sec = self.window_wakeups / (mono - self.window_start)
+            self.window_start, self.window_wakeups = mono, 0
+
+    def frame_shown(self, now):
+        """Chamado após o desenho: quando o segundo exibido muda, mede o atraso até a tela."""
+        second = now.replace(microsecond=0)
+        if self.shown_second is not None and second != self.shown_second:
+            self.record("drift_ms", (datetime.now() - second).total_seconds() * 1000)
+        self.shown_second = second
+
+    def hud_lines(self):
+        render, getch, size, drift = (self.hist[name] for name in self.FIELDS)
+        return [
+            f"render {render.last or 0:6.2f}ms p99 {render.percentile(99):6.2f}",
+            f"getch  {getch.last or 0:6.3f}ms p99 {getch.percentile(99):6.3f}",
+            f"wakeups {self.wakeups_per_sec:5.1f}/s total {self.wakeups}",
+            f"bytes  {size.last or 0:6.0f}/frame avg {size.mean():5.0f}",
+            f"drift  {drift.last or 0:6.1f}ms p99 {drift.percentile(99):6.1f}",
+        ]
+
+    def to_dict(self):
+        return {
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "seconds": time.time() - self.started,
+            "wakeups": self.wakeups,
+            "wakeups_per_sec": self.wakeups / max(time.time() - self.started, 1e-9),
+            "term": os.environ.get("TERM", ""),
+            "ssh": bool(os.environ.get("SSH_CONNECTION")),
+            "histograms": {name: hist.to_dict() for name, hist in self.hist.items()},
+        }
+
+    def export(self, path=METRICS_FILE):
+        """Grava as métricas em JSON (completo) ou CSV (um resumo por métrica, pela extensão)."""
+        if path.endswith(".csv"):
+            columns = ("count", "mean", "min", "max", "p50", "p90", "p99")
+            lines = ["metric," + ",".join(columns)]
+            for name, hist in self.hist.items():
+                summary = hist.summary()
+                lines.append(name + "," + ",".join(str(round(summary[c], 4)) for c in columns))
+            text = "\n".join(lines) + "\n"
+        else:
+            text = json.dumps(self.to_dict(), indent=2)
+        _write_atomic(path, text)
+        return path
+
+def draw_hud(frame, metrics):
+    """Sobrepõe o HUD de métricas no canto superior direito do frame."""
+    x = max(frame.w - HUD_WIDTH - 1, 0)
+    for y, line in enumerate(metrics.hud_lines()):
+        frame.addstr(y, x, line.ljust(HUD_WIDTH), curses.A_REVERSE)
+
+def install_metrics_signal():
+    """SIGUSR1 pede a exportação das métricas; retorna a função que consome o pedido."""
+    requested = []
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: requested.append(signum))
+
+    def pending():
+        if requested:
+            requested.clear()
+            return True
+        return False
+    return pending
+
+# --- Headless output ---
+ANSI_COLORS = {"black": 30, "red": 31, "green": 32, "yellow": 33, "blue": 34, "magenta": 35, "cyan": 36, "white": 37}
+
+def _sgr(attr, color_names):
+    codes = ["0"]
+    if attr & curses.A_BOLD: codes.append("1")
+    if attr & curses.A_DIM: codes.append("2")
+    if attr & curses.A_REVERSE: codes.append("7")
+    color = color_names.get(attr & curses.A_COLOR)
+    if color:
+        codes.append(str(ANSI_COLORS[color]))
+    return "\x1b[" + ";".join(codes) + "m"
+
+def frame_to_ansi(frame):
+    """Converte o frame em texto com sequências SGR, uma linha por linha da tela."""
+    color_names = {attr: name for name, attr in pair_map.items()}
+    out = []
+    for chars, attrs in zip(frame.chars, frame.attrs):
+        line, current = [], None
+        for char, attr in zip(chars, attrs):
+            if attr != current:
+                line.append(_sgr(attr, color_names))
+                current = attr
+            line.append(char)
+        out.append("".join(line) + "\x1b[0m\x1b[K")
+    return "\r\n".join(out)
+
+def run_headless(fps=1.0, frames=0, fmt="text", output="-", size=(80, 24), startup_cmds=(), profile=None,
+                 metrics_file=None):
+    """Gera frames sem TTY, em texto puro (separados por form feed) ou ANSI."""
+    set_color_pairs(headless_color_pairs())
+    state = default_state()
+    state.update(load_config())
+    ensure_panes(state)  # Antes do lote: `mode`/`focus` valem para os painéis salvos
+    if profile:
+        profile.mark("load_config")
+    run_batch(startup_cmds, state)
+    w, h = size
+    out = sys.stdout if output == "-" else open(output, "w", encoding="utf-8")
+    interval = 1.0 / fps
+    next_frame = time.monotonic()
+    msg = ""
+    count = 0
+    export_requested = install_metrics_signal()
+    metrics = state["metrics"]
+    try:
+        while not frames or count < frames:
+            metrics.wakeup()
+            if export_requested():
+                metrics.export(metrics_file or METRICS_FILE)
+            now = datetime.now()
+            msg = tick_panes(state, now) or msg
+            start = time.perf_counter()
+            frame = compose_layout(state, now, h, w, msg)
+            if state["hud"]:
+                draw_hud(frame, metrics)
+            text = "\x1b[H" + frame_to_ansi(frame) if fmt == "ansi" else frame.to_text() + "\n\f\n"
+            out.write(text)
+            out.flush()
+            metrics.record("render_ms", (time.perf_counter() - start) * 1000)
+            metrics.record("bytes", len(text.encode("utf-8")))
+            metrics.frame_shown(now)
+            count += 1
+            if profile:
+                profile.mark("first_frame")
+                break
+            if frames and count >= frames:
+                break
+            next_frame += interval
+            delay = next_frame - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_frame = time.monotonic()  # Atrasado: não tenta recuperar frames perdidos
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if metrics_file and not profile:
+            metrics.export(metrics_file)
+
+# --- Control socket ---
+def open_control_socket(path):
+    """Cria o socket Unix de controle (só o dono acessa); None se outra instância já atende nele."""
+    import socket  # Sob demanda: o headless e o --batch não precisam dele
+    clockpaths.prepare(path)  # Diretório privado; recusa um socket de outro usuário no caminho
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return None
+    except FileNotFoundError:
+        pass
+    except ConnectionRefusedError:
+        os.unlink(path)  # Sobra de uma instância que não fechou direito
+    finally:
+        probe.close()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)
+    try:
+        sock.bind(path)
+    finally:
+        os.umask(umask)
+    sock.listen()
+    sock.setblocking(False)
+    return sock
+
+
+async def wait_event(event, timeout):
+    """Espera o evento ou o prazo e o rearma.
+
+    Usa call_later em vez de asyncio.wait_for: não cria uma tarefa por espera e não
+    engole o cancelamento quando o evento chega junto com ele (Python < 3.12).
+    """
+    import asyncio
+    handle = asyncio.get_running_loop().call_later(timeout, event.set)
+    try:
+        await event.wait()
+    finally:
+        handle.cancel()
+    event.clear()
+
+
+class ClockApp:
+    """Interface curses sobre asyncio: tarefas de entrada, tick e alarmes, mais o socket de controle.
+
+    Tudo roda numa única thread; as tarefas só se comunicam por eventos, então
+    o estado é alterado sem locks. Sem `stdscr` (modo daemon) não há entrada nem
+    desenho: só os ticks, os alarmes, o socket e o arquivo de status.
+    """
+
+    def __init__(self, stdscr, state, store, profile=None, metrics_file=None, status=None):
+        self.stdscr = stdscr
+        self.state = state
+        self.store = store
+        self.profile = profile
+        self.metrics_file = metrics_file
+        self.status = status
+        self.renderer = FrameRenderer(stdscr) if stdscr else None
+        self.compositor = Compositor(stdscr) if stdscr else None
+        self.force = True  # Próximo desenho monta todos os painéis, vencidos ou não
+        self.beep = curses.beep if stdscr else (lambda: None)
+        self.msg = ""
+        self.input_buffer = ""
+        self.escape = []  # Prefixo de um marcador de colagem ainda incompleto
+        self.paste = None  # Teclas coladas, entre PASTE_START e PASTE_END
+        self.recall = None  # Posição na recuperação do histórico de comandos (↑/↓)
+        import asyncio  # Já carregado por main(); local para o módulo não depender dele
+        self.redraw = asyncio.Event()
+        self.input_ready = asyncio.Event()
+        self.jobs_changed = asyncio.Event()
+        self.done = asyncio.Event()
+
+    def request_redraw(self):
+        self.force = True
+        self.redraw.set()
+
+    def stop(self):
+        self.done.set()
+
+    def run_command(self, cmd):
+        """Executa um comando do buffer ou do socket; a resposta vira a mensagem da tela."""
+        reply = handle_cmd(cmd, focused_pane(self.state))
+        self.store.mark_dirty()  # Gravação adiada; pulada se nada mudou
+        self.jobs_changed.set()  # A agenda pode ter mudado
+        if reply == "quit":
+            self.stop()
+        else:
+            self.msg = reply
+            self.request_redraw()
+        return reply
+
+    # --- Tasks ---
+    async def run(self, control_sock=None):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        coros = [self.tick_loop(), self.alarm_loop()]
+        if self.stdscr:
+            loop.add_reader(sys.stdin.fileno(), self.input_ready.set)
+            loop.add_signal_handler(signal.SIGWINCH, self.resize)
+            os.write(sys.stdout.fileno(), PASTE_ON)
+            coros.append(self.input_loop())
+        else:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                loop.add_signal_handler(signum, self.stop)
+        if hasattr(signal, "SIGUSR1"):
+            loop.add_signal_handler(signal.SIGUSR1, self.export_metrics)
+        server = await asyncio.start_unix_server(self.serve_client, sock=control_sock) if control_sock else None
+        tasks = [asyncio.create_task(coro) for coro in coros]
+        stopper = asyncio.create_task(self.done.wait())
+        try:
+            finished, _ = await asyncio.wait(tasks + [stopper], return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                if task is not stopper:
+                    task.result()  # Propaga a exceção de uma tarefa que morreu
+        finally:
+            for task in tasks + [stopper]:
+                task.cancel()
+            await asyncio.gather(*tasks, stopper, return_exceptions=True)
+            if self.stdscr:
+                loop.remove_reader(sys.stdin.fileno())
+                os.write(sys.stdout.fileno(), PASTE_OFF)
+            if server:
+                server.close()
+                await server.wait_closed()
+
+    async def tick_loop(self):
+        """Desenha, publica o status e dorme até o próximo prazo visível, um pedido de redesenho ou o flush da config."""
+        metrics = self.state["metrics"]
+        while True:
+            metrics.wakeup()
+            now = datetime.now()
+            tick_msg = tick_panes(self.state, now, beep=self.beep, fire_jobs=False)
+            if tick_msg:
+                self.msg = tick_msg
+            if self.stdscr:
+                self.draw(now)
+            if self.status:
+                self.status.publish(*status_fields(self.state, now, self.msg))
+            if self.profile:
+                self.profile.mark("first_frame")
+                self.stop()  # Só mede a inicialização; o relatório sai depois do endwin
+                return
+            if self.store.poll():
+                self.jobs_changed.set()  # Outra instância mudou a configuração (talvez a agenda)
+                continue
+            deadline = panes_deadline(self.state, now) if self.stdscr else daemon_deadline(self.state, now)
+            if self.status:
+                deadline = min(deadline, now + timedelta(seconds=STATUS_HEARTBEAT))
+            timeout = max((deadline - datetime.now()).total_seconds(), 0)
+            flush_in = self.store.seconds_until_flush()
+            if flush_in is not None:
+                timeout = min(timeout, flush_in)
+            await wait_event(self.redraw, timeout)
+
+    def draw(self, now):
+        metrics = self.state["metrics"]
+        start = time.perf_counter()
+        force, self.force = self.force, False
+        if len(ensure_panes(self.state)) > 1:
+            hud = metrics if self.state["hud"] else None
+            written = self.compositor.draw(self.state, now, self.msg, self.input_buffer, force, hud)
+            self.renderer.invalidate()  # Ao voltar para um modo só, repinta a tela inteira
+        else:
+            h, w = self.stdscr.getmaxyx()
+            frame = compose_frame(self.state, now, h, w, self.msg, self.input_buffer)
+            if self.state["hud"]:
+                draw_hud(frame, metrics)
+            written = self.renderer.draw(frame)
+            self.compositor.invalidate()
+        metrics.record("render_ms", (time.perf_counter() - start) * 1000)
+        metrics.record("bytes", written)
+        metrics.frame_shown(now)
+
+    async def input_loop(self):
+        """Acordada pelo add_reader do stdin: lê todas as teclas disponíveis e pede um único redesenho."""
+        metrics = self.state["metrics"]
+        while True:
+            await self.input_ready.wait()
+            self.input_ready.clear()
+            keys = []
+            while True:
+                start = time.perf_counter()
+                try:
+                    ch = self.stdscr.getch()
+                except curses.error:
+                    ch = -1
+                metrics.record("getch_ms", (time.perf_counter() - start) * 1000)
+                if ch == -1:
+                    break
+                keys.append(ch)
+            self.feed_keys(keys)
+            sync_layout(self.state)  # Atalhos de modo mudam o painel em foco
+            self.request_redraw()
+
+    def feed_keys(self, keys):
+        """Processa um lote de teclas, separando o texto colado (bracketed paste) das teclas digitadas."""
+        for ch in keys:
+            if self.done.is_set():
+                return
+            marker = PASTE_START if self.paste is None else PASTE_END
+            self.escape.append(ch)
+            if tuple(self.escape) == marker[:len(self.escape)]:
+                if len(self.escape) == len(marker):
+                    self.escape = []
+                    if self.paste is None:
+                        self.paste = []
+                    else:
+                        self.paste_text(self.paste)
+                        self.paste = None
+                continue
+            pending, self.escape = self.escape, []
+            if len(pending) > 1 and ch == marker[0]:
+                pending, self.escape = pending[:-1], [ch]  # O ESC que quebrou o prefixo pode abrir outro
+            for key in pending:
+                if self.paste is None:
+                    self.handle_key(key)
+                else:
+                    self.paste.append(key)
+        # Colagens longas (SSH, tmux) chegam em pedaços e um marcador pode ficar dividido entre lotes:
+        # o prefixo pendente espera o próximo lote. Só um ESC solto fora de uma colagem é tecla de verdade.
+        if self.paste is None and self.escape == [PASTE_START[0]]:
+            self.escape = []
+            self.handle_key(PASTE_START[0])
+
+    def paste_text(self, keys):
+        """Texto colado entra no buffer de uma vez, sem executar nada nem acionar atalhos."""
+        text = bytes(key for key in keys if 0 <= key < 256).decode("utf-8", "replace")
+        text = " ".join("".join(c if c.isprintable() else " " for c in text).split())
+        if self.input_buffer.startswith("["):
+            self.input_buffer += text
+        elif text.startswith("["):
+            self.input_buffer = text
+        elif text:
+            self.msg = "Paste ignored: commands start with ["
+
+    async def alarm_loop(self):
+        """Dispara alarmes e contagens no prazo exato, independente do ritmo de desenho."""
+        while True:
+            deadline = self.state["scheduler"].next_deadline()
+            # Revê a agenda ao menos uma vez por minuto: o relógio de parede pode saltar (NTP, suspensão)
+            timeout = ALARM_RECHECK if deadline is None else min(max((deadline - datetime.now()).total_seconds(), 0), ALARM_RECHECK)
+            await wait_event(self.jobs_changed, timeout)
+            msg = fire_due_jobs(self.state, datetime.now(), self.beep)
             if msg:
-                stdscr.addstr(h - 4, 1, msg[:w - 2], curses.A_BOLD)
-            stdscr.addstr(h - 3, 1, f"Mode: {state['mode']} | Color: {state['color']}", curses.A_DIM)
-            if state["alarm_time"]:
-                stdscr.addstr(h - 2, 1, f"Alarm set for {state['alarm_time'].strftime('%H:%M')}", curses.A_DIM)
-            stdscr.addstr(h - 1, 1, "> " + input_buffer)
-            stdscr.clrtoeol()
+                self.msg = msg
+                self.store.mark_dirty()  # Disparos alteram a agenda persistida
+                self.request_redraw()
 
-        stdscr.refresh()
+    async def serve_client(self, reader, writer):
+        """Uma conexão do socket: um comando por linha, uma resposta JSON por linha."""
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Linha acima do limite do StreamReader (64 KiB): o resto dela viraria lixo, então encerra
+                    await self._send(writer, {"cmd": "", "reply": "Command too long", "error": "ValueError"})
+                    break
+                if not line:
+                    break
+                cmd = line.decode("utf-8", "replace").strip()
+                if cmd.startswith("[") and cmd.endswith("]"):
+                    cmd = cmd[1:-1].strip()
+                try:
+                    reply = self.run_command(cmd)
+                    response = {"cmd": cmd, "reply": reply, "state": state_snapshot(self.state, datetime.now())}
+                except Exception as e:  # Um comando com defeito não derruba a conexão nem escreve por cima da tela
+                    reply = f"Error: {e}"
+                    response = {"cmd": cmd, "reply": reply, "error": type(e).__name__}
+                await self._send(writer, response)
+                if reply == "quit":
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
 
-        # --- Non-blocking input ---
-        stdscr.nodelay(True)
+    @staticmethod
+    async def _send(writer, response):
+        writer.write((json.dumps(response) + "\n").encode("utf-8"))
+        await writer.drain()
+
+    # --- Events ---
+    def resize(self):
         try:
-            ch = stdscr.getch()
-        except:
-            ch = -1
-        stdscr.nodelay(False)  # Reset for next getch
+            cols, lines = os.get_terminal_size(sys.__stdout__.fileno())
+        except OSError:
+            cols, lines = curses.COLS, curses.LINES
+        if (lines, cols) != self.stdscr.getmaxyx():
+            curses.resizeterm(lines, cols)
+        self.renderer.invalidate()
+        self.compositor.invalidate()
+        self.request_redraw()
 
-        if ch == -1:
-            time.sleep(0.1)
-            continue
+    def export_metrics(self):
+        try:
+            self.msg = f"Metrics saved to {self.state['metrics'].export(self.metrics_file or METRICS_FILE)}"
+        except OSError as e:
+            self.msg = f"Cannot save metrics: {e.strerror}"
+        self.request_redraw()
 
+    def remember(self, cmd):
+        history = self.state["command_history"]
+        if cmd and (not history or history[-1] != cmd):
+            history.append(cmd)
+            del history[:-COMMAND_HISTORY]
+            self.store.mark_dirty()
+
+    def complete(self):
+        """Tab no modo de comando: completa a palavra atual ou lista as opções."""
+        text = self.input_buffer[1:]
+        if text.endswith("]"):
+            return
+        word = "" if not text or text.endswith(" ") else text.split()[-1]
+        options = complete_command(text, focused_pane(self.state))
+        if len(options) == 1:
+            self.input_buffer = "[" + text[:len(text) - len(word)] + options[0] + " "
+            return
+        if not options:
+            self.msg = "No completions"
+            return
+        common = os.path.commonprefix(options)
+        if len(common) > len(word) and common.lower().startswith(word.lower()):
+            self.input_buffer = "[" + text[:len(text) - len(word)] + common
+        self.msg = " ".join(options)
+
+    def recall_command(self, step):
+        """↑/↓ no modo de comando: percorre o histórico; depois do mais recente volta ao buffer vazio."""
+        history = self.state["command_history"]
+        if not history:
+            return
+        pos = (len(history) if self.recall is None else self.recall) + step
+        if pos >= len(history):
+            self.recall, self.input_buffer = None, "["
+        else:
+            self.recall = max(pos, 0)
+            self.input_buffer = f"[{history[self.recall]}]"
+
+    def focused_area(self):
+        """(linhas, colunas, chrome) com que o painel em foco é desenhado."""
+        h, w = self.stdscr.getmaxyx()
+        if len(self.state["panes"]) < 2:
+            return h, w, True
+        chrome = not self.state["minimal_mode"] and h > 5
+        focused = focused_pane(self.state)
+        for pane, _, (y, x, ph, pw) in _pane_slots(self.state, h - 5 if chrome else h, w):
+            if pane is focused:
+                return ph - 1, pw - (x + pw < w), False  # Sem a linha de título e o divisor (compose_pane)
+        return h, w, True
+
+    def handle_key(self, ch):
+        state = focused_pane(self.state)
+        if ch == curses.KEY_RESIZE:
+            self.resize()
+            return
+        h, w = self.stdscr.getmaxyx()
         # --- Input handling (cleaned up) ---
-        if input_buffer.startswith("["):
+        if self.input_buffer.startswith("["):
             # Command mode: handle buffer
-            if ch in (curses.KEY_BACKSPACE, 127, 8):
-                input_buffer = input_buffer[:-1]
+            if ch in BACKSPACE_KEYS:
+                self.input_buffer = self.input_buffer[:-1]
             elif ch in (10, 13):  # Enter
-                if input_buffer.endswith("]"):
-                    cmd = input_buffer[1:-1].strip()
-                    msg = handle_cmd(cmd, state)
-                    save_config(state) # Salva a configuração após um comando
-                    if msg == "quit":
-                        break
+                if self.input_buffer.endswith("]"):
+                    cmd = self.input_buffer[1:-1].strip()
+                    self.remember(cmd)
+                    self.run_command(cmd)
                 else:
-                    msg = "Invalid: use [cmd]"
-                input_buffer = ""
+                    self.msg = "Invalid: use [cmd]"
+                self.input_buffer = ""
+                self.recall = None
+            elif ch in (curses.KEY_UP, curses.KEY_DOWN):
+                self.recall_command(-1 if ch == curses.KEY_UP else 1)
+            elif ch == 9:  # Tab
+                self.complete()
             elif 32 <= ch < 127:
-                input_buffer += chr(ch)
-        else:
-            # Shortcut mode
-            if ch == ord('q'):
-                break
-            elif ch == ord('s'):
-                state["show_seconds"] = not state["show_seconds"]
-                msg = "Toggled seconds"
-            elif ch == ord('h'):
-                state["h12"] = not state["h12"]
-                msg = "Toggled 12h"
-            elif ch == ord('c'):
-                idx = (COLORS.index(state["color"]) + 1) % len(COLORS)
-                state["color"] = COLORS[idx]
-                msg = f"Color: {state['color']}"
-            elif ch == ord('d'):
-                state["show_date"] = not state["show_date"]
-                msg = "Toggled date"
-            elif ch == ord('b'):
-                state["blink_colon"] = not state["blink_colon"]
-                msg = "Toggled blinking colon"
-            elif ch == ord('w'):
-                state["mode"] = "stopwatch"
-                msg = "Stopwatch mode"
-            elif ch == ord('t'):
-                state["mode"] = "timer"
-                msg = "Timer mode"
-            elif ch == ord('p'):
-                state["mode"] = "pomodoro"
-                msg = "Pomodoro mode"
-            elif ch == ord('a'):
-                state["mode"] = "clock"
-                msg = "Clock mode (with alarm support)"
-            elif ch == ord('z'):
-                state["mode"] = "worldclock"
-                msg = "World Clock mode"
-            elif ch == ord('o'):
-                state["minimal_mode"] = not state["minimal_mode"]
-                msg = "Toggled zen mode"
-            elif ch == ord('?'):
-                msg = "Commands: [mode ...], [start], [pause], [reset], [set timer 5m], [set alarm 14:30], [add tz Zone/Name], [remove tz Zone/Name], [list tz], [help], [quit]"
-            elif ch in (curses.KEY_BACKSPACE, 127, 8) and input_buffer:
-                input_buffer = input_buffer[:-1]
-            elif ch in (10, 13):
-                input_buffer = ""  # Clear on enter without [
-            elif 32 <= ch < 127:
-                input_buffer += chr(ch)
-                if input_buffer == "[":
-                    pass  # Start command mode
-                else:
-                    input_buffer = ""  # Discard non-command input
+                self.input_buffer += chr(ch)
+            return
+        # Shortcut mode
+        self.store.mark_dirty()
+        if ch == ord('q'):
+            self.stop()
+        elif ch == ord('s'):
+            state["show_seconds"] = not state["show_seconds"]
+            self.msg = "Toggled seconds"
+        elif ch == ord('h'):
+            state["h12"] = not state["h12"]
+            self.msg = "Toggled 12h"
+        elif ch == ord('c'):
+            idx = (COLORS.index(state["color"]) + 1) % len(COLORS)
+            state["color"] = COLORS[idx]
+            self.msg = f"Color: {state['color']}"
+        elif ch == ord('d'):
+            state["show_date"] = not state["show_date"]
+            self.msg = "Toggled date"
+        elif ch == ord('b'):
+            state["blink_colon"] = not state["blink_colon"]
+            self.msg = "Toggled blinking colon"
+        elif ch == ord('w'):
+            state["mode"] = "stopwatch"
+            self.msg = "Stopwatch mode"
+        elif ch == ord('t'):
+            state["mode"] = "timer"
+            self.msg = "Timer mode"
+        elif ch == ord('p'):
+            state["mode"] = "pomodoro"
+            self.msg = "Pomodoro mode"
+        elif ch == ord('a'):
+            state["mode"] = "clock"
+            self.msg = "Clock mode (with alarm support)"
+        elif ch == ord('z'):
+            state["mode"] = "worldclock"
+            self.msg = "World Clock mode"
+        elif ch == ord('o'):
+            state["minimal_mode"] = not state["minimal_mode"]
+            self.msg = "Toggled zen mode"
+        elif ch == ord('m'):
+            state["hud"] = not state["hud"]
+            self.msg = "Performance HUD on" if state["hud"] else "Performance HUD off"
+        elif ch == 9 and len(state["panes"]) > 1:  # Tab
+            state["focus"] = (state["focus"] + 1) % len(state["panes"])
+            self.msg = f"Pane {state['focus'] + 1}: {focused_pane(state)['mode']}"
+        elif ch == ord('?'):
+            self.msg = help_text()
+        elif ch in SCROLL_KEYS and state["mode"] in ("worldclock", "stopwatch"):
+            scroll_by(state, ch, list_window(state, datetime.now(), *self.focused_area()))
+        elif ch in BACKSPACE_KEYS and self.input_buffer:
+            self.input_buffer = self.input_buffer[:-1]
+        elif ch in (10, 13):
+            self.input_buffer = ""  # Clear on enter without [
+        elif 32 <= ch < 127:
+            self.input_buffer += chr(ch)
+            if self.input_buffer != "[":
+                self.input_buffer = ""  # Discard non-command input
 
-def handle_cmd(cmd, state):
-    if not cmd:
-        return ""
-    parts = cmd.split()
-    if parts[0] in ("quit", "exit"):
-        return "quit"
-    if parts[0] == "date":
-        state["show_date"] = not state["show_date"]
-        return "Toggled date"
-    if parts[0] == "quote":
-        state["show_quote"] = not state["show_quote"]
-        return "Toggled quote"
-    if parts[0] == "blink":
-        state["blink_colon"] = not state["blink_colon"]
-        return "Toggled blinking colon"
-    if parts[0] == "mode" and len(parts) > 1:
-        if parts[1] in ("clock", "stopwatch", "timer", "pomodoro", "worldclock"):
-            state["mode"] = parts[1]
-            return f"Mode: {parts[1]}"
-    if parts[0] == "start":
-        if state["mode"] == "stopwatch":
-            state["stopwatch_start"] = datetime.now()
-        elif state["mode"] == "timer" and state["timer_duration"] > 0:
-            if state["timer_paused"]:
-                state["timer_end"] = datetime.now() + timedelta(seconds=state["timer_remaining"])
-                state["timer_paused"] = False
-            else:
-                state["timer_end"] = datetime.now() + timedelta(seconds=state["timer_duration"])
-        elif state["mode"] == "pomodoro":
-            duration = state["pomodoro_work"] if state["pomodoro_phase"] == "work" else state["pomodoro_break"]
-            state["pomodoro_end"] = datetime.now() + timedelta(seconds=duration)
-        return "Started"
-    if parts[0] == "pause":
-        if state["mode"] == "stopwatch" and state["stopwatch_start"]:
-            state["stopwatch_elapsed"] += (datetime.now() - state["stopwatch_start"]).total_seconds()
-            state["stopwatch_start"] = None
-            return "Paused stopwatch"
-        elif state["mode"] == "timer" and state["timer_end"]:
-            state["timer_remaining"] = int((state["timer_end"] - datetime.now()).total_seconds())
-            state["timer_end"] = None
-            state["timer_paused"] = True
-            return "Paused timer"
-    if parts[0] == "reset":
-        if state["mode"] == "stopwatch":
-            state.update(stopwatch_start=None, stopwatch_elapsed=0, laps=[])
-            return "Stopwatch reset"
-        if state["mode"] == "timer":
-            state.update(timer_end=None, timer_duration=0, timer_remaining=0, timer_paused=False)
-            return "Timer reset"
-        if state["mode"] == "pomodoro":
-            state.update(pomodoro_end=None, pomodoro_phase="work", pomodoro_cycles=0)
-            return "Pomodoro reset"
-    if parts[0] == "lap" and state["mode"] == "stopwatch":
-        elapsed = state["stopwatch_elapsed"]
-        if state["stopwatch_start"]:
-            elapsed += (datetime.now() - state["stopwatch_start"]).total_seconds()
-        state["laps"].append(elapsed)
-        return f"Lap {len(state['laps'])} saved"
-    if parts[0] == "laps" and state["mode"] == "stopwatch":
-        if not state["laps"]:
-            return "No laps"
-        return "Laps: " + ", ".join(f"{i+1}: {int(t)//60:02d}:{int(t)%60:02d}" for i, t in enumerate(state["laps"]))
-    if parts[0] == "set" and len(parts) > 2:
-        if parts[1] == "timer":
-            try:
-                secs = parse_time_str(parts[2])
-                state["timer_duration"] = secs
-                return f"Timer set to {secs}s"
-            except:
-                return "Invalid timer value"
-        if parts[1] == "alarm":
-            alarm = parse_alarm_time(parts[2])
-            if alarm:
-                state["alarm_time"] = alarm
-                state["alarm_triggered"] = False
-                return f"Alarm set for {parts[2]}"
-            else:
-                return "Invalid alarm time (HH:MM)"
-        if parts[1] == "pomodoro" and len(parts) > 3:
-            if parts[2] == "work":
-                try:
-                    secs = parse_time_str(parts[3])
-                    state["pomodoro_work"] = secs
-                    return f"Pomodoro work set to {secs}s"
-                except:
-                    return "Invalid value"
-            if parts[2] == "break":
+
+def main(stdscr, startup_cmds=(), profile=None, metrics_file=None, control_socket=clockpaths.CONTROL_SOCKET,
+         status_file=None):
+    """Interface curses; com `stdscr=None` roda como daemon (só ticks, alarmes, socket e status)."""
+    if stdscr:
+        curses.curs_set(0)  # Hide cursor for better style
+        curses.start_color()
+        curses.use_default_colors()
+        for idx, name in enumerate(COLOR_MAP.keys(), start=1):
+            curses.init_pair(idx, COLOR_MAP[name], -1)
+        set_color_pairs({name: curses.color_pair(idx) for idx, name in enumerate(COLOR_MAP.keys(), start=1)})
+        stdscr.nodelay(True)
+        if profile:
+            profile.mark("curses_init")  # Inclui o initscr feito pelo curses.wrapper
+    import asyncio  # Sob demanda: o headless, o --batch e o cliente ctl não pagam este import
+    if profile:
+        profile.mark("asyncio")
+
+    state = default_state()
+    state.update(load_config())
+    ensure_panes(state)
+    if profile:
+        profile.mark("load_config")
+    store = ConfigStore(state)
+    state["history"] = HistoryLog()
+
+    msg = ""
+    if startup_cmds:
+        replies = run_batch(startup_cmds, state)
+        store.mark_dirty()  # Uma única gravação para o lote inteiro
+        if replies:
+            msg = replies[-1][1]
+    control_sock = None
+    if control_socket and not profile:
+        try:
+            control_sock = open_control_socket(control_socket)
+            if control_sock is None:
+                msg = f"Control socket in use by another clock: {control_socket}"
+        except OSError as e:
+            msg = f"Control socket unavailable: {e.strerror}"
+        if not stdscr and control_sock is None:
+            sys.exit(msg)  # Um daemon sem socket não teria como ser controlado
+    status = None
+    if status_file:
+        try:
+            status = clockstatus.StatusWriter(status_file)
+        except OSError as e:
+            msg = f"Status file unavailable: {e.strerror}: {status_file}"
+            if not stdscr:
+                if control_sock:
+                    control_sock.close()
+                    os.unlink(control_socket)
+                sys.exit(msg)
+
+    async def run():
+        app = ClockApp(stdscr, state, store, profile, metrics_file, status)
+        app.msg = msg
+        await app.run(control_sock)
+
+    try:
+        asyncio.run(run())
+    finally:
+        store.flush()  # Grava alterações pendentes na saída
+        state["history"].close()
+        for sock, path in ((control_sock, control_socket), (status, status_file)):
+            if sock:
+                sock.close()
                 try:
-                    secs = parse_time_str(parts[3])
-                    state["pomodoro_break"] = secs
-                    return f"Pomodoro break set to {secs}s"
-                except:
-                    return "Invalid value"
-    if parts[0] == "clear" and len(parts) > 1:
-        if parts[1] == "alarm":
-            state["alarm_time"] = None
-            state["alarm_triggered"] = False
-            return "Alarm cleared"
-    if parts[0] == "add" and len(parts) > 2 and parts[1] == "tz":
-        tz_name = parts[2]
+                    os.unlink(path)  # Leitores sem arquivo sabem que não há relógio
+                except OSError:
+                    pass
+        if metrics_file and not profile:
+            state["metrics"].export(metrics_file)
+
+# --- Command registry ---
+class Arg:
+    """Argumento posicional de um comando: conversor, escolhas válidas e mensagem de erro."""
+
+    def __init__(self, name, convert=str, choices=None, error=None, complete=None):
+        self.name = name
+        self.convert = convert
+        self.choices = choices
+        self.complete = complete  # fn(prefixo, estado) -> sugestões para o Tab, quando não há `choices`
+        self.error = error or (f"Invalid {name} ({', '.join(choices)})" if choices else f"Invalid {name}")
+
+    def parse(self, text):
+        if self.choices:
+            if text not in self.choices:
+                raise ValueError(self.error)
+            return text
+        try:
+            return self.convert(text)
+        except (ValueError, TypeError):
+            raise ValueError(self.error)
+
+
+class Command:
+    """Entrada do registro: caminho (verbo e subverbos), argumentos e handler."""
+
+    def __init__(self, path, handler, args, summary, variadic):
+        self.path = path
+        self.handler = handler
+        self.args = args
+        self.summary = summary
+        self.variadic = variadic
+        # O último argumento de um comando variádico aceita zero ou mais palavras
+        self.min_args = len(args) - 1 if variadic else len(args)
+
+    @property
+    def usage(self):
+        names = [f"<{arg.name}>" for arg in self.args]
+        if self.variadic:
+            names[-1] = f"[{names[-1]}...]"
+        return " ".join(self.path + tuple(names))
+
+    def run(self, state, words):
+        if not self.args:
+            return self.handler(state)
+        if len(words) < self.min_args:
+            return f"Usage: [{self.usage}]"
         try:
-            pytz.timezone(tz_name) # Valida o fuso horário
-            if tz_name not in state["world_clocks"]:
-                state["world_clocks"].append(tz_name)
-                return f"Added timezone: {tz_name}"
+            if self.variadic:
+                *fixed, rest = self.args
+                values = list(map(Arg.parse, fixed, words))
+                values.append([rest.parse(word) for word in words[len(fixed):]])
             else:
-                return f"{tz_name} já está na lista."
-        except pytz.UnknownTimeZoneError:
-            return f"Fuso horário desconhecido: {tz_name}"
-    if parts[0] == "remove" and len(parts) > 2 and parts[1] == "tz":
-        tz_name = parts[2]
-        if tz_name in state["world_clocks"]:
-            state["world_clocks"].remove(tz_name)
-            return f"Removed timezone: {tz_name}"
+                values = list(map(Arg.parse, self.args, words))
+        except ValueError as e:
+            return str(e)
+        return self.handler(state, *values)
+
+
+COMMANDS = {}  # caminho (tupla de palavras) -> Command
+COMMAND_ROUTES = {}  # verbo -> [(subcaminho, Command)], do mais longo para o mais curto
+
+@functools.lru_cache(maxsize=None)
+def help_text():
+    seen = []
+    for entry in COMMANDS.values():
+        if entry.usage not in seen and entry.path[0] != "exit":
+            seen.append(entry.usage)
+    return "Commands: " + ", ".join(f"[{usage}]" for usage in seen)
+
+def command(path, *args, summary="", variadic=False, aliases=()):
+    """Decorator que registra um handler `fn(state, *args) -> str` sob `path` (ex.: "set timer")."""
+    def register(fn):
+        for name in (path,) + tuple(aliases):
+            key = tuple(name.split())
+            entry = COMMANDS[key] = Command(key, fn, args, summary, variadic)
+            routes = COMMAND_ROUTES.setdefault(key[0], [])
+            routes.append((list(key[1:]), entry))
+            routes.sort(key=lambda route: -len(route[0]))
+        help_text.cache_clear()
+        return fn
+    return register
+
+def parse_command(cmd):
+    """Resolve o comando pelo caminho mais longo registrado; retorna (Command ou None, argumentos)."""
+    parts = cmd.split()
+    for subpath, entry in COMMAND_ROUTES.get(parts[0], ()):
+        n = len(subpath) + 1
+        if parts[1:n] == subpath:
+            return entry, parts[n:]
+    return None, parts
+
+def handle_cmd(cmd, state):
+    if not cmd:
+        return ""
+    entry, words = parse_command(cmd)
+    if entry is None:
+        return f"Unknown command: {cmd}"
+    reply = entry.run(state, words)
+    sync_layout(state)  # O comando pode ter mudado o modo de um painel
+    return reply
+
+def complete_command(text, state=None):
+    """Completa a última palavra do texto do buffer de comando; retorna as opções possíveis.
+
+    Argumentos com `complete` (os fusos) sugerem por prefixo do nome, da cidade ou de
+    um apelido, então as opções nem sempre começam com o que foi digitado.
+    """
+    words = text.split()
+    if not text or text.endswith(" "):
+        words.append("")
+    done, prefix = tuple(words[:-1]), words[-1]
+    options = set()
+    completed = []
+    for path, entry in COMMANDS.items():
+        if path[:len(done)] == done and len(path) > len(done):
+            options.add(path[len(done)])
+        elif path == done[:len(path)]:
+            index = len(done) - len(path)
+            if entry.variadic and index >= len(entry.args):
+                index = len(entry.args) - 1
+            if 0 <= index < len(entry.args):
+                arg = entry.args[index]
+                if arg.choices:
+                    options.update(arg.choices)
+                elif arg.complete:
+                    completed.extend(option for option in arg.complete(prefix, state) if option not in completed)
+    return sorted(option for option in options if option.startswith(prefix)) + completed
+
+def run_batch(commands, state):
+    """Aplica uma sequência de comandos ao estado; para no primeiro quit. Retorna as respostas."""
+    replies = []
+    for line in commands:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            line = line[1:-1].strip()
+        reply = handle_cmd(line, focused_pane(state))  # Como no teclado: vale para o painel em foco
+        if reply == "quit":
+            break
+        replies.append((line, reply))
+    return replies
+
+
+def _parse_alarm(text):
+    alarm = parse_alarm_time(text)
+    if alarm is None:
+        raise ValueError(text)
+    return alarm
+
+def _toggle(key, on, off=None):
+    def toggle(state):
+        state[key] = not state[key]
+        return on if off is None else (on if state[key] else off)
+    return toggle
+
+@command("quit", summary="sai do programa", aliases=("exit",))
+def _cmd_quit(state):
+    return "quit"
+
+@command("mode", Arg("mode", choices=MODES), summary="muda de modo")
+def _cmd_mode(state, mode):
+    state["mode"] = mode
+    return f"Mode: {mode}"
+
+command("date", summary="mostra/oculta a data")(_toggle("show_date", "Toggled date"))
+command("quote", summary="mostra/oculta a citação")(_toggle("show_quote", "Toggled quote"))
+command("blink", summary="liga/desliga o piscar dos dois pontos")(_toggle("blink_colon", "Toggled blinking colon"))
+command("lowpower", summary="modo de baixo consumo no relógio zen")(
+    _toggle("low_power", "Low-power mode on (zen clock wakes once a minute)", "Low-power mode off"))
+command("hud", summary="mostra/oculta o HUD de desempenho")(_toggle("hud", "Performance HUD on", "Performance HUD off"))
+def _stats(period):
+    def stats(state):
+        return history_stats(period, date.today(), history_days())
+    return stats
+
+for _period in STATS_PERIODS:
+    command(f"stats {_period}", summary=f"resumo do histórico ({_period})",
+            aliases=("stats",) if _period == "today" else ())(_stats(_period))
+command("group tz", summary="agrupa fusos com o mesmo offset")(
+    _toggle("wc_group", "Grouping zones by offset", "Zone grouping off"))
+
+@command("layout", Arg("mode", choices=MODES), variadic=True, summary="divide a tela em painéis, um por modo")
+def _cmd_layout(state, modes):
+    if not modes:
+        layout = state["layout"]
+        return "Layout: " + " | ".join(layout) if len(layout) > 1 else "Single view (use [layout <mode> <mode>...])"
+    if len(modes) > MAX_PANES:
+        return f"At most {MAX_PANES} panes"
+    base = state["panes"][0] if state["panes"] else state  # O comando pode vir de um painel
+    base["layout"] = modes if len(modes) > 1 else []
+    if len(modes) == 1:
+        base["mode"] = modes[0]
+        base["focus"] = 0
+    ensure_panes(base)
+    return "Layout: " + " | ".join(modes) if len(modes) > 1 else f"Single view: {modes[0]}"
+
+@command("focus", Arg("pane", int), summary="escolhe o painel que recebe os comandos")
+def _cmd_focus(state, pane):
+    panes = state["panes"]
+    if not 1 <= pane <= max(len(panes), 1):
+        return f"No pane {pane}"
+    state["focus"] = pane - 1
+    return f"Pane {pane}: {focused_pane(state)['mode']}"
+
+@command("start", summary="inicia cronômetro, timer ou pomodoro")
+def _cmd_start(state):
+    if state["mode"] == "stopwatch":
+        if state["stopwatch_start"] is None:
+            state["stopwatch_start"] = time.monotonic_ns()
+    elif state["mode"] == "timer" and state["timer_duration"] > 0:
+        if state["timer_paused"]:
+            state["timer_end"] = datetime.now() + timedelta(seconds=state["timer_remaining"])
+            state["timer_paused"] = False
         else:
-            return f"Fuso horário não encontrado: {tz_name}"
-    if parts[0] == "list" and len(parts) > 1 and parts[1] == "tz":
-        return "Fusos horários: " + ", ".join(state["world_clocks"]) if state["world_clocks"] else "Nenhum fuso horário configurado."
-    if parts[0] == "randomquote":
-        return random.choice(QUOTES)
-    if parts[0] == "help":
-        return "Commands: [mode ...], [start], [pause], [reset], [set timer 5m], [set alarm 14:30], [add tz Zone/Name], [remove tz Zone/Name], [list tz], [help], [quit]"
-    return f"Unknown command: {cmd}"
+            state["timer_end"] = datetime.now() + timedelta(seconds=state["timer_duration"])
+    elif state["mode"] == "pomodoro":
+        duration = state["pomodoro_work"] if state["pomodoro_phase"] == "work" else state["pomodoro_break"]
+        state["pomodoro_end"] = datetime.now() + timedelta(seconds=duration)
+    return "Started"
+
+@command("pause", summary="pausa cronômetro ou timer")
+def _cmd_pause(state):
+    if state["mode"] == "stopwatch" and state["stopwatch_start"] is not None:
+        state["stopwatch_elapsed"] = stopwatch_elapsed_ns(state)
+        state["stopwatch_start"] = None
+        return "Paused stopwatch"
+    if state["mode"] == "timer" and state["timer_end"]:
+        state["timer_remaining"] = int((state["timer_end"] - datetime.now()).total_seconds())
+        state["timer_end"] = None
+        state["timer_paused"] = True
+        return "Paused timer"
+    return "Nothing to pause"
+
+@command("reset", summary="reinicia o modo atual")
+def _cmd_reset(state):
+    if state["mode"] == "stopwatch":
+        elapsed = stopwatch_elapsed_ns(state) // 10**9
+        if elapsed:
+            log_event(state, "stopwatch", datetime.now(), elapsed, f"{len(state['laps'])} laps")
+        state.update(stopwatch_start=None, stopwatch_elapsed=0, laps=Laps(), lap_scroll=0)
+        return "Stopwatch reset"
+    if state["mode"] == "timer":
+        state.update(timer_end=None, timer_duration=0, timer_remaining=0, timer_paused=False)
+        return "Timer reset"
+    if state["mode"] == "pomodoro":
+        state.update(pomodoro_end=None, pomodoro_phase="work", pomodoro_cycles=0)
+        return "Pomodoro reset"
+    return "Nothing to reset"
+
+@command("lap", summary="grava uma volta (cronômetro)")
+def _cmd_lap(state):
+    if state["mode"] != "stopwatch":
+        return "Laps are only available in stopwatch mode"
+    laps = state["laps"]
+    laps.append(stopwatch_elapsed_ns(state))
+    return f"Lap {len(laps)} saved: {format_ns(laps.times[-1])} (+{format_ns(laps.last_split)})"
+
+@command("laps", summary="lista as voltas (cronômetro)")
+def _cmd_laps(state):
+    if state["mode"] != "stopwatch":
+        return "Laps are only available in stopwatch mode"
+    return state["laps"].summary()
+
+@command("set timer", Arg("duration", parse_time_str, error="Invalid timer value"), summary="duração do timer (5m, 1h, 45s)")
+def _cmd_set_timer(state, secs):
+    state["timer_duration"] = secs
+    return f"Timer set to {secs}s"
+
+@command("set alarm", Arg("HH:MM", _parse_alarm, error="Invalid alarm time (HH:MM)"), summary="define o alarme")
+def _cmd_set_alarm(state, alarm):
+    if state["scheduler"].conflict("alarm", "alarm"):
+        return "Name alarm is used by a countdown"
+    state["scheduler"].add(Job("alarm", "alarm", alarm, alarm.strftime("%H:%M")))
+    return f"Alarm set for {alarm.strftime('%H:%M')}"
+
+@command("set pomodoro work", Arg("duration", parse_time_str, error="Invalid value"), summary="duração do trabalho")
+def _cmd_set_pomodoro_work(state, secs):
+    state["pomodoro_work"] = secs
+    return f"Pomodoro work set to {secs}s"
+
+@command("set pomodoro break", Arg("duration", parse_time_str, error="Invalid value"), summary="duração da pausa")
+def _cmd_set_pomodoro_break(state, secs):
+    state["pomodoro_break"] = secs
+    return f"Pomodoro break set to {secs}s"
+
+@command("clear alarm", summary="remove o alarme")
+def _cmd_clear_alarm(state):
+    state["scheduler"].remove("alarm", "alarm")
+    return "Alarm cleared"
+
+@command("alarm add", Arg("name"), Arg("HH:MM", _parse_alarm, error="Invalid alarm time (HH:MM)"),
+         Arg("repeat", parse_repeat, error="Invalid repeat (daily, weekdays, weekends, mon,wed,...)"),
+         summary="alarme nomeado, opcionalmente recorrente", variadic=True)
+def _cmd_alarm_add(state, name, alarm, repeat):
+    if len(repeat) > 1:
+        return "Use a single repeat: daily, weekdays, weekends or mon,wed,..."
+    if state["scheduler"].conflict(name, "alarm"):
+        return f"Name {name} is used by a countdown"
+    job = Job.alarm(name, alarm.strftime("%H:%M"), repeat[0] if repeat else None)
+    state["scheduler"].add(job)
+    return f"Alarm {name} set for {job.when.strftime('%a %H:%M')}" + (f" ({job.repeat})" if job.repeat else "")
+
+@command("alarm remove", Arg("name"), summary="remove um alarme nomeado")
+def _cmd_alarm_remove(state, name):
+    job = state["scheduler"].remove(name, "alarm")
+    return f"Removed alarm {name}" if job else f"No alarm named {name}"
+
+@command("alarms", summary="lista os alarmes")
+def _cmd_alarms(state):
+    alarms = state["scheduler"].of_kind("alarm")
+    if not alarms:
+        return "No alarms"
+    now = datetime.now()
+    return "Alarms: " + ", ".join(job.describe(now) for job in alarms)
+
+@command("countdown add", Arg("name"), Arg("duration", parse_time_str, error="Invalid value"),
+         summary="contagem regressiva nomeada")
+def _cmd_countdown_add(state, name, secs):
+    if state["scheduler"].conflict(name, "countdown"):
+        return f"Name {name} is used by an alarm"
+    state["scheduler"].add(Job.countdown(name, secs))
+    return f"Countdown {name} started ({secs}s)"
+
+@command("countdown remove", Arg("name"), summary="cancela uma contagem regressiva")
+def _cmd_countdown_remove(state, name):
+    job = state["scheduler"].remove(name, "countdown")
+    return f"Removed countdown {name}" if job else f"No countdown named {name}"
+
+@command("countdowns", summary="lista as contagens regressivas")
+def _cmd_countdowns(state):
+    countdowns = state["scheduler"].of_kind("countdown")
+    if not countdowns:
+        return "No countdowns"
+    now = datetime.now()
+    return "Countdowns: " + ", ".join(job.describe(now) for job in countdowns)
+
+def _complete_known_tz(prefix, state):
+    return tz_index().prefix(prefix, limit=50)
+
+def _complete_configured_tz(prefix, state):
+    key = _tz_key(prefix)
+    return [name for name in (state or {}).get("world_clocks", ())
+            if any(part.startswith(key) for part in (_tz_key(name), _tz_key(name).rsplit("/", 1)[-1]))]
+
+def _add_tz(state, text):
+    tz_name = tz_index().resolve(text) or text  # Apelido, cidade ou maiúsculas/minúsculas trocadas
+    if get_zone(state, tz_name) is None: # Valida o fuso horário (e guarda em cache)
+        state["tz_cache"].pop(tz_name)
+        suggestions = tz_index().search(text)
+        hint = f" (sugestões: {', '.join(suggestions)})" if suggestions else ""
+        return f"Fuso horário desconhecido: {text}{hint}"
+    if tz_name in state["world_clocks"]:
+        return f"{tz_name} já está na lista."
+    state["world_clocks"].append(tz_name)
+    return f"Added timezone: {tz_name}"
+
+@command("add tz", Arg("Zone/Name", complete=_complete_known_tz), variadic=True,
+         summary="adiciona fusos ao relógio mundial (nome, cidade ou apelido: sp, nyc, PST)")
+def _cmd_add_tz(state, names):
+    if not names:
+        return "Usage: [add tz <Zone/Name>...]"
+    return "; ".join([_add_tz(state, text) for text in names])
+
+def _remove_tz(state, text):
+    tz_name = text if text in state["world_clocks"] else tz_index().resolve(text)
+    if tz_name not in state["world_clocks"]:
+        return f"Fuso horário não encontrado: {text}"
+    state["world_clocks"].remove(tz_name)
+    state.get("tz_cache", {}).pop(tz_name, None)
+    return f"Removed timezone: {tz_name}"
+
+@command("remove tz", Arg("Zone/Name", complete=_complete_configured_tz), variadic=True,
+         summary="remove fusos do relógio mundial")
+def _cmd_remove_tz(state, names):
+    if not names:
+        return "Usage: [remove tz <Zone/Name>...]"
+    return "; ".join([_remove_tz(state, text) for text in names])
+
+@command("find tz", Arg("query"), variadic=True, summary="busca fusos por nome, cidade ou apelido, tolerando erros")
+def _cmd_find_tz(state, words):
+    if not words:
+        return "Usage: [find tz <query>]"
+    query = " ".join(words)  # Cidades com espaço: [find tz sao paulo]
+    found = tz_index().search(query)
+    return "Fusos: " + ", ".join(found) if found else f"Nenhum fuso encontrado para: {query}"
+
+@command("sort tz", Arg("order", choices=WC_SORTS), summary="ordena o relógio mundial")
+def _cmd_sort_tz(state, order):
+    state["wc_sort"] = order
+    return f"World clocks sorted by: {order}"
+
+@command("list tz", summary="lista os fusos configurados")
+def _cmd_list_tz(state):
+    return "Fusos horários: " + ", ".join(state["world_clocks"]) if state["world_clocks"] else "Nenhum fuso horário configurado."
+
+@command("randomquote", summary="mostra uma citação aleatória")
+def _cmd_randomquote(state):
+    return random.choice(QUOTES)
+
+@command("help", Arg("command"), summary="lista os comandos; help <comando> detalha", variadic=True)
+def _cmd_help(state, topic):
+    if not topic:
+        return help_text()
+    matches = {entry.usage: entry.summary for path, entry in COMMANDS.items() if path[:len(topic)] == tuple(topic)}
+    if not matches:
+        return f"Unknown command: {' '.join(topic)}"
+    return " | ".join(f"[{usage}] {summary}" for usage, summary in matches.items())
+
+@command("metrics export", Arg("file"), variadic=True, summary="grava as métricas em JSON ou CSV (.csv)")
+def _cmd_metrics_export(state, file):
+    try:
+        return f"Metrics saved to {state['metrics'].export(file[0] if file else METRICS_FILE)}"
+    except OSError as e:
+        return f"Cannot save metrics: {e.strerror}"
+
+@command("metrics reset", summary="zera os histogramas de desempenho")
+def _cmd_metrics_reset(state):
+    state["metrics"].reset()
+    return "Metrics reset"
+
+def _parse_size(value):
+    try:
+        w, h = (int(n) for n in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("use LARGURAxALTURA, ex.: 80x24")
+    return w, h
+
+def _positive_float(value):
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"número inválido: {value}")
+    if not 0 < number < float("inf"):  # Também recusa nan
+        raise argparse.ArgumentTypeError(f"precisa ser maior que zero: {value}")
+    return number
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Relógio de terminal minimalista.")
+    parser.add_argument("--headless", action="store_true", help="gera frames sem TTY em vez de abrir a interface curses")
+    parser.add_argument("--fps", type=_positive_float, default=1.0, help="frames por segundo no modo headless (padrão: 1)")
+    parser.add_argument("--frames", type=int, default=0, help="número de frames a gerar (0 = até ser interrompido)")
+    parser.add_argument("--format", choices=("text", "ansi"), default="text", help="formato dos frames headless")
+    parser.add_argument("--output", default="-", help="arquivo de saída dos frames (padrão: stdout)")
+    parser.add_argument("--size", type=_parse_size, help="tamanho do frame headless, ex.: 80x24 (padrão: o terminal)")
+    parser.add_argument("--mode", choices=MODES, help="modo inicial")
+    parser.add_argument("--exec", action="append", default=[], metavar="CMD",
+                        help="aplica um comando na inicialização (pode repetir), ex.: --exec 'set timer 5m'")
+    parser.add_argument("--script", metavar="FILE", help="aplica os comandos do arquivo, um por linha ('-' = stdin)")
+    parser.add_argument("--batch", action="store_true", help="só aplica --exec/--script e sai, sem abrir a interface")
+    parser.add_argument("--control", default=clockpaths.CONTROL_SOCKET, metavar="PATH",
+                        help=f"socket Unix da API de controle (padrão: {clockpaths.CONTROL_SOCKET})")
+    parser.add_argument("--no-control", action="store_const", const="", dest="control",
+                        help="não abre o socket de controle")
+    parser.add_argument("--status-file", nargs="?", const=clockstatus.STATUS_FILE, metavar="PATH",
+                        help=f"publica o status a cada tick para clockstatus.py (padrão: {clockstatus.STATUS_FILE})")
+    parser.add_argument("--daemon", action="store_true",
+                        help="roda sem interface: alarmes, socket de controle e arquivo de status")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help=f"grava as métricas de desempenho na saída e a cada SIGUSR1 (.json ou .csv; padrão do sinal: {METRICS_FILE})")
+    parser.add_argument("--startup-profile", nargs="?", const="text", choices=("text", "json"),
+                        help="mede as fases da inicialização até o primeiro frame, imprime e sai")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_MS, metavar="MS",
+                        help=f"orçamento de inicialização; com --startup-profile sai com código 1 se excedido (padrão: {STARTUP_BUDGET_MS:.0f})")
+    return parser.parse_args(argv)
+
+def run_batch_cli(commands):
+    """Aplica o lote ao estado salvo, imprime as respostas e grava a configuração uma vez."""
+    state = default_state()
+    state.update(load_config())
+    ensure_panes(state)
+    store = ConfigStore(state)
+    for line, reply in run_batch(commands, state):
+        print(f"[{line}] {reply}")
+    store.flush()
+
+def _startup_commands(args):
+    commands = list(args.exec)
+    if args.script == "-":
+        commands.extend(sys.stdin.read().splitlines())
+    elif args.script:
+        with open(args.script, encoding="utf-8") as f:
+            commands.extend(f.read().splitlines())
+    return commands
+
+_T_MODULE = time.perf_counter()
 
 if __name__ == "__main__":
-    curses.wrapper(main)
+    if sys.argv[1:2] == ["ctl"]:
+        # Cliente da API de controle; python3 clockctl.py faz o mesmo sem carregar este módulo
+        import clockctl
+        sys.exit(clockctl.main(sys.argv[2:]))
+    args = parse_args()
+    profile = StartupProfile(args.startup_budget) if args.startup_profile else None
+    if profile:
+        profile.mark("args")
+    commands = _startup_commands(args)
+    if args.mode:
+        commands.insert(0, f"mode {args.mode}")
+    if args.batch or args.script == "-":
+        # Com o stdin consumido pelo script não há terminal para a interface
+        run_batch_cli(commands)
+    elif args.headless:
+        size = args.size or tuple(shutil.get_terminal_size((80, 24)))
+        run_headless(args.fps, args.frames, args.format, args.output, size, commands, profile, args.metrics)
+    elif args.daemon:
+        main(None, commands, None, args.metrics, args.control, args.status_file or clockstatus.STATUS_FILE)
+    else:
+        curses.wrapper(main, commands, profile, args.metrics, args.control, args.status_file)
+    if profile:
+        print(profile.report(args.startup_profile))
+        sys.exit(1 if profile.over_budget() else 0)